@@ -74,9 +74,24 @@ alpha_status['A'..'Z'] -> MISS, HIT, PARTIAL, or (?)None
 """
 
 import re
+import os
+import mmap
+import struct
+import hashlib
 import random
+from math import log2, exp, inf
+from operator import itemgetter
+from array import array
+from collections import Counter, OrderedDict
 from pprint import pprint
 import sys
+import json
+import time
+import asyncio
+import itertools
+import functools
+import cProfile
+from concurrent.futures import ProcessPoolExecutor
 
 
 ##spelling_dictionary = []
@@ -84,8 +99,53 @@ import sys
 SOLUTIONS_FILE = 'wordle-solutions-list.txt'    # Solution will be selected from this
 GUESSES_FILE = 'wordle-dictionary.txt'    # Guesses must be in this list
 FREQUENCY_FILE = 'wordle-frequency-dictionary.txt'
+CACHE_FILE = '.wordle-cache.bin'    # Compiled from the three lists above
 
 ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+WORD_LENGTH = 5     # Unless the word lists say otherwise
+MATRIX_LIMIT = 50_000_000   # Most (guess, solution) pairs worth precomputing
+MATRIX_MAX_LENGTH = 10      # Longest words whose codes fit in two bytes
+
+# How the computer chooses its guesses.
+#   letters: most valued letters still in play (the original)
+#   entropy: most expected information about the solution
+#   frequency: fewest expected guesses, common words being likelier
+#   lookahead: fewest expected guesses, searching LOOKAHEAD_DEPTH guesses on
+#   minimax: fewest guesses in the worst case, searching the same way
+STRATEGIES = ('letters', 'entropy', 'frequency', 'lookahead', 'minimax')
+# These score guesses with the feedback matrix, so need word lists small
+# enough, and words short enough, to have one (see MATRIX_LIMIT).
+MATRIX_STRATEGIES = ('entropy', 'frequency', 'lookahead', 'minimax')
+
+# How much print_guess_result shows after each guess (--verbosity):
+#   full: the board, the possibilities, and letter and guess values
+#   summary: just the board and the possibilities
+#   none: just the guess and its result
+VERBOSITY = ('full', 'summary', 'none')
+CANDIDATES_SHOWN = 20   # Most possibilities to list out in full
+
+# Look-ahead search only tries the LOOKAHEAD_TOP_K most informative
+# guesses at each step, and gives up for the plain entropy choice if the
+# turn runs past LOOKAHEAD_BUDGET seconds.  The entropy ranking is always
+# finished, being the fallback, so it's the least a turn can take.  See
+# set_lookahead.
+LOOKAHEAD_DEPTH = 2
+LOOKAHEAD_TOP_K = 10
+LOOKAHEAD_BUDGET = 1.0
+
+# Prior chance of a word being the solution, from its rank in the
+# FREQUENCY_FILE: a sigmoid that is near 1 for the commonest words and
+# falls away past FREQUENCY_MIDPOINT.
+FREQUENCY_MIDPOINT = 10000
+FREQUENCY_WIDTH = 2000
+FREQUENCY_FLOOR = 0.001     # Prior of unranked or very rare words
+BITS_PER_GUESS = 4.0        # Rough information gained by a later guess
+
+WORDLE_TURNS = 6    # Guesses allowed in a real game
+MAX_TURNS = 20      # Give up on a game after this many guesses
+RHYME_TRAP_WORDS = 3        # A rhyme trap is at least this many possibilities,
+RHYME_TRAP_POSITIONS = 2    # differing in at most this many positions
+BOARD_EXTRA_TURNS = 5   # Multi-board games allow boards + 5 guesses (Quordle 9, Octordle 13)
 
 class Knowledge():
     """State of a current (or prospective) guess."""
@@ -96,15 +156,20 @@ class Knowledge():
     MISS = '-'      # Can't eval to False
     UNKNOWN = ' '
 
-    def __init__(self, wordlist:list[str]) -> None:
-        self.position_knwon = {}
-        self.position_known = {} # 0..4, val = False or the letter
-        self.position_not = {}   # 0..4, val = str of letters known not to be at this pos
+    # The dicts are copied on write, never changed in place once made,
+    # so branches can share them and branch() and undo() are O(1).
+    __slots__ = ('length', 'position_known', 'position_not', 'alpha_status', 'alpha_known',
+            'alpha_count', 'alpha_not', 'wordlist', 'history', 'previous')
+
+    def __init__(self, wordlist:list[str], length:int=None) -> None:
+        self.length = length or (len(wordlist[0]) if wordlist else WORD_LENGTH)
+        self.position_known = {} # 0..length-1, val = False or the letter
+        self.position_not = {}   # 0..length-1, val = str of letters known not to be at this pos
         self.alpha_status = {}   # A..Z, val = HIT, PARTIAL, MISS, or UNKNOWN
         self.alpha_known = ''    # str of letters known to be in word (naive about dups)
         self.alpha_count = {}    # A..Z, val = min occurances of this letter in solution
         self.alpha_not = ''      # str of letters known not to be in word
-        for i in range(0,5):
+        for i in range(0,self.length):
             self.position_known[i] = False
             self.position_not[i] = ''
         for ch in ALPHABET:
@@ -112,11 +177,35 @@ class Knowledge():
             self.alpha_count[ch] = 0
         self.alpha_not = ''
         self.wordlist = wordlist
+        self.history = []        # (guess, result) pairs, in order guessed
+        self.previous = None     # What was known before the last update
+
+    def branch(self) -> 'Knowledge':
+        """Returns a copy that can be updated without affecting this one."""
+        twin = Knowledge.__new__(Knowledge)
+        for name in Knowledge.__slots__:
+            setattr(twin, name, getattr(self, name))
+        return twin
+
+    def undo(self):
+        """Goes back to what was known before the last update."""
+        # Also undoes any pruning of wordlist since that update.
+        if self.previous is None:
+            raise IndexError("Nothing to undo")
+        previous = self.previous
+        for name in Knowledge.__slots__:
+            setattr(self, name, getattr(previous, name))
 
     def update(self:object, guess: str, result:str):
         """Updates what's knowns based on the guess and the result."""
 
-        for this in range(0,5):
+        self.previous = self.branch()
+        self.position_known = dict(self.position_known)
+        self.position_not = dict(self.position_not)
+        self.alpha_status = dict(self.alpha_status)
+        self.alpha_count = dict(self.alpha_count)
+        self.history = self.history + [(guess, result)]
+        for this in range(0,self.length):
             this_letter = guess[this]
             match result[this]:
                 case Knowledge.HIT:
@@ -134,7 +223,7 @@ class Knowledge():
         # If a letter in guess is a MISS and the same letter isn't
         # already known to be PARTIAL or HIT, then we know that
         # letter does not occur at all.
-        for this in range(0,5):
+        for this in range(0,self.length):
             if result[this] == Knowledge.MISS and self.alpha_status[guess[this]] not in Knowledge.HIT+Knowledge.PARTIAL:
                 self.alpha_status[guess[this]] = Knowledge.MISS
 
@@ -150,7 +239,7 @@ class Knowledge():
 
         # Count number of occurances of a given letter
         multi = {}
-        for pos in range(0,5):
+        for pos in range(0,self.length):
             myletter = guess[pos]
             if result[pos] in Knowledge.HIT + Knowledge.PARTIAL:
                 if myletter not in multi:
@@ -161,66 +250,345 @@ class Knowledge():
             if count > self.alpha_count[letter]:
                 self.alpha_count[letter] = count
 
+    def fingerprint(self) -> str:
+        """Returns a digest of everything a guess is chosen from."""
+        # Two states with the same possibilities and letter counts get the
+        # same guess from every strategy, however they were arrived at.
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(''.join(str(self.alpha_count[ch]) for ch in ALPHABET).encode())
+        digest.update('\n'.join(self.wordlist).encode())
+        return digest.hexdigest()
+
+def unique_words( *sources, seen:set=None ):
+    """Yields the words of each source in turn, skipping any already seen."""
+    # seen is updated as words are yielded, so can be shared across calls.
+    seen = set() if seen is None else seen
+    for source in sources:
+        for w in source:
+            if w not in seen:
+                seen.add(w)
+                yield w
+
 def merge_lists( list1:list[str], list2:list[str] ) -> list[str]:
     """Adds anything in list2 but not list1 to list1"""
     # The order of list1 is preserved in the returned list.
-    for w in list2:
-        if w not in list1:
-            list1.append(w)
+    list1.extend(unique_words(list2, seen=set(list1)))
     return list1
 
-def load_wordlist( wordfile:str ) -> list[str]:
+class Rejects():
+    """Tally of the lines a word list skipped, keeping the first few bad ones."""
+
+    SAMPLES_KEPT = 5
+
+    def __init__(self) -> None:
+        self.other_length = 0   # Words, but not of the length wanted
+        self.bad = 0            # Anything else
+        self.samples = []
+
+    def add(self, line:str, is_word:bool):
+        """Counts line as skipped."""
+        if is_word:
+            self.other_length += 1
+            return
+        self.bad += 1
+        if len(self.samples) < Rejects.SAMPLES_KEPT:
+            self.samples.append(line)
+
+    def report(self, wordfile:str) -> str:
+        """Returns a line about what was skipped from wordfile, or None."""
+        if not (self.bad or self.other_length):
+            return None
+        report = f"Word list {wordfile}:"
+        if self.other_length:
+            report += f" skipped {self.other_length} words of other lengths"
+        if self.bad:
+            report += f"{',' if self.other_length else ''} rejected {self.bad} lines, " \
+                    f"such as {', '.join(repr(x) for x in self.samples)}"
+        return report
+
+def read_words( wordfile:str, length:int=WORD_LENGTH, rejects:Rejects=None ):
+    """Yields the words in file, in order, one line at a time."""
+    # Skips blank lines and lines that start with '#'.  Other lines that
+    # aren't words of length letters are counted in rejects.
+    r_good = re.compile( '[A-Z]{%d}' % length)
+    r_word = re.compile( '[A-Z]+')
+    r_ignore = re.compile(  r'\s*(#.*)?' ) # blanks & comments
+    with open( wordfile ) as f:
+        for line in f:
+            w = line.strip().upper()
+            if len(w) == length and r_good.fullmatch(w):
+                yield w
+            elif rejects is not None and not r_ignore.fullmatch(w):
+                rejects.add(w, r_word.fullmatch(w) is not None)
+
+def load_wordlist( wordfile:str, length:int=WORD_LENGTH ) -> list[str]:
     """Reads a word list from file, preserving order."""
-    # Skips blank lines and lines that start with '#'
-
-    # Read file into wordlist.
-    f = open( wordfile )
-    lst = f.readlines()
-    f.close()
-    lst = [x.strip().upper() for x in lst]
-    r_good = re.compile( '^[A-Z]{5}$')
-    r_ignore = re.compile(  '^\s*(#.*)*$' ) # blanks & comments
-    newlist = []
-    for w in lst:
-        if r_good.match(w):
-            newlist.append(w)
-        elif not r_ignore.match(w):
-            print( f"Word {w} rejected from list in {wordfile}")
+    # Only the words are kept in memory, however long the file, and what
+    # was skipped is reported in one line.
+    rejects = Rejects()
+    newlist = list(read_words(wordfile, length, rejects))
+    report = rejects.report(wordfile)
+    if report:
+        print(report)
     return newlist
 
+def letter_mask( letters:str ) -> int:
+    """Returns bitset of the letters, bit i for ALPHABET[i]."""
+    mask = 0
+    for ltr in letters:
+        mask |= 1 << ALPHABET.index(ltr)
+    return mask
+
+class LetterIndex():
+    """Words by their letters, whatever the order."""
+    # Each word has a signature, its letters sorted, and a mask, the set of
+    # its letters.  Words sharing a mask are queried together, and there
+    # are fewer masks than words.
+
+    SUBMASK_LIMIT = 12  # Most letters to enumerate every subset of
+
+    def __init__(self, wordlist:list[str]) -> None:
+        self.words = list(wordlist)
+        self.position = {}
+        self.by_signature = {}  # sorted letters -> words, in list order
+        self.by_mask = {}       # letter mask -> words, in list order
+        for i, w in enumerate(self.words):
+            self.position.setdefault(w, i)
+            self.by_signature.setdefault(''.join(sorted(w)), []).append(w)
+            self.by_mask.setdefault(letter_mask(w), []).append(w)
+        self.masks = list(self.by_mask)
+
+    def in_order(self, groups) -> list[str]:
+        """Returns the words in groups, in list order."""
+        found = list(itertools.chain.from_iterable(groups))
+        found.sort(key=self.position.__getitem__)
+        return found
+
+    def anagrams(self, letters:str) -> list[str]:
+        """Returns words made of exactly letters, rearranged."""
+        return list(self.by_signature.get(''.join(sorted(letters)), []))
+
+    def using_only(self, letters:str) -> list[str]:
+        """Returns words with no letters but these."""
+        # With few letters, look up every subset of them; otherwise check
+        # every mask.
+        mask = letter_mask(letters)
+        if mask.bit_count() <= LetterIndex.SUBMASK_LIMIT:
+            groups = []
+            sub = mask
+            while sub:
+                if sub in self.by_mask:
+                    groups.append(self.by_mask[sub])
+                sub = (sub - 1) & mask
+        else:
+            groups = [words for m, words in self.by_mask.items() if m & ~mask == 0]
+        return self.in_order(groups)
+
+    def using_exactly(self, letters:str) -> list[str]:
+        """Returns words with all of these letters and no others."""
+        return list(self.by_mask.get(letter_mask(letters), []))
+
+    def containing_all(self, letters:str) -> list[str]:
+        """Returns words with all of these letters, and maybe others."""
+        mask = letter_mask(letters)
+        return self.in_order(words for m, words in self.by_mask.items() if m & mask == mask)
+
+    def best_cover(self, letters:dict[str:int]) -> str:
+        """Returns the word with the most of letters, the most weighty if tied."""
+        # letters is letter:weight.  Returns None if no word has any.
+        # Counting each mask's letters, and picking out the most, are done
+        # in C by map() and compress().
+        mask = letter_mask(letters)
+        masks = self.masks
+        covered = list(map(int.bit_count, map(mask.__and__, masks)))
+        most = max(covered, default=0)
+        if not most:
+            return None
+        weight = {letter_mask(ltr): letters[ltr] for ltr in letters}
+        tied = list(itertools.compress(masks, map(most.__eq__, covered)))
+        best = max(tied, key=lambda m: sum(w for b, w in weight.items() if m & b))
+        return self.by_mask[best][0]
+
+_letter_indexes = OrderedDict()
+
+def letter_index( wordlist:list[str] ) -> LetterIndex:
+    """Returns LetterIndex for wordlist, reusing one already built."""
+    # Keyed by identity and length, like letter_stats.
+    key = (id(wordlist), len(wordlist))
+    entry = _letter_indexes.get(key)
+    if entry and entry[0] is wordlist:
+        _letter_indexes.move_to_end(key)
+        return entry[1]
+    index = LetterIndex(wordlist)
+    _letter_indexes[key] = (wordlist, index)
+    while len(_letter_indexes) > 8:
+        _letter_indexes.popitem(last=False)
+    return index
+
 def anagram_strict( wordlist:list[str], letters:str ) -> list[str]:
     """Return a list of words that are made up of & use all of [letters]."""
-    r = re.compile( '^[' + letters.upper() + ']+$')
-    return list(filter(r.match, wordlist))
+    # Any of letters may be used more than once, or not at all.
+    return letter_index(wordlist).using_only(letters.upper())
 
 def anagram_loose( wordlist:list[str], letters:str ) -> list[str]:
     """Return a list of words that include all [letters] (& maybe others)."""
-    letters = letters.upper()
-    r = re.compile( '^[' + letters.upper() + ']+$')
-    newlist = list(filter(r.match, wordlist))
-    for ltr in letters:
-        r = re.compile( ltr )
-        newlist = list(filter(r.search, newlist))
-    return newlist
+    # Made up of letters, as for anagram_strict, using every one of them.
+    return letter_index(wordlist).using_exactly(letters.upper())
 
-def fishing_guess():
-    """Return a 'best' next guess to fish out more info."""
-    pass
+def is_rhyme_trap( known:'Knowledge' ) -> bool:
+    """Returns True if the possibilities differ in just a position or two."""
+    if len(known.wordlist) < RHYME_TRAP_WORDS:
+        return False
+    differing = [pos for pos in range(0,known.length)
+            if len({w[pos] for w in known.wordlist}) > 1]
+    return len(differing) <= RHYME_TRAP_POSITIONS
 
-def calculate_guess(wordlist:list, known:Knowledge):
+def fishing_guess( spelling_dictionary:list[str], known:'Knowledge' ) -> str:
+    """Return a 'best' next guess to fish out more info."""
+    # In a rhyme trap (LIGHT, MIGHT, NIGHT, SIGHT...) the possibilities
+    # differ in a position or two, and guessing them one by one can run
+    # out of turns.  Better to guess the word covering the most of the
+    # letters still undecided there, whether or not it could be the
+    # solution.  Letters in more possibilities count for more on a tie.
+    # Returns None if nothing is left to decide.
+    decided = known.alpha_known + known.alpha_not
+    undecided = set()
+    for pos in range(0,known.length):
+        column = {w[pos] for w in known.wordlist}
+        if len(column) > 1:
+            undecided |= column
+    undecided -= set(decided)
+    if not undecided:
+        return None
+    weights = {ltr: sum(ltr in w for w in known.wordlist) for ltr in undecided}
+    return letter_index(spelling_dictionary).best_cover(weights)
+
+# Hits and misses of the caches in this process, for the Profiler.
+CACHE_STATS = Counter()
+
+def words_digest( wordlist:list[str] ) -> str:
+    """Returns a digest of wordlist, telling apart lists of the same size."""
+    return hashlib.blake2b('\n'.join(wordlist).encode(), digest_size=16).hexdigest()
+
+class GuessCache():
+    """Bounded LRU cache of guess rankings, keyed by Knowledge state."""
+
+    RANKING_KEPT = 10   # How much of each ranking is worth keeping
+
+    def __init__(self, maxsize:int=4096) -> None:
+        self.maxsize = maxsize
+        self.entries = OrderedDict()    # key -> ranking, best guess first
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the ranking cached for key, or None."""
+        ranking = self.entries.get(key)
+        if ranking is None:
+            self.misses += 1
+            CACHE_STATS['memo_misses'] += 1
+            return None
+        self.hits += 1
+        CACHE_STATS['memo_hits'] += 1
+        self.entries.move_to_end(key)
+        return ranking
+
+    def put(self, key, ranking:list[str]):
+        """Caches ranking for key, dropping the least recently used."""
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = list(ranking[:GuessCache.RANKING_KEPT])
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters and size."""
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries)}
+
+    def save(self, path:str):
+        """Writes the cached rankings to path."""
+        with open(path, 'w') as f:
+            json.dump([[k[0], k[1], k[2], v] for k, v in self.entries.items()], f)
+
+    def load(self, path:str):
+        """Reads cached rankings from path, if it exists."""
+        if not os.path.exists(path):
+            return
+        with open(path) as f:
+            for strategy, guesses, fingerprint, ranking in json.load(f):
+                self.put((strategy, guesses, fingerprint), ranking)
+
+def rank_guesses(wordlist:list, known:Knowledge, matrix:'FeedbackMatrix'=None,
+        strategy:str='letters') -> list[str]:
+    """Returns wordlist's guesses by strategy, best first."""
+    if strategy == 'entropy':
+        return most_informative_words(wordlist, known, matrix)
+    if strategy == 'frequency':
+        return most_likely_words(wordlist, known, matrix)
+    if strategy == 'lookahead':
+        return lookahead_words(wordlist, known, matrix, 'expected')
+    if strategy == 'minimax':
+        return lookahead_words(wordlist, known, matrix, 'worst')
+    word_val = valued_list(wordlist, known)
+    ranking = sorted(word_val, key=word_val.get, reverse=True)
+    best = word_val[ranking[0]]
+    tied = [w for w in ranking if word_val[w] == best]
+    # Break ties with the guess that splits the possibilities into the
+    # most different results.
+    if matrix and len(tied) > 1:
+        guess = max(tied, key=lambda w: len(matrix.pattern_counts(w, known.wordlist)))
+        ranking.remove(guess)
+        ranking.insert(0, guess)
+    # In a rhyme trap, fish for the letters that would settle it, with a
+    # guess that needn't be one of the possibilities.
+    if is_rhyme_trap(known):
+        guess = fishing_guess(wordlist, known)
+        if guess in word_val:
+            ranking.remove(guess)
+        if guess:
+            ranking.insert(0, guess)
+    return ranking
+
+def calculate_guess(wordlist:list, known:Knowledge, matrix:'FeedbackMatrix'=None,
+        strategy:str='letters', verbose:bool=True, memo:GuessCache=None, hard:bool=False,
+        index:'WordIndex'=None):
     """Calculate a guess."""
-    valued_words = most_valued_words(wordlist,known)
-    guess = valued_words[0]
-    print( f"\n--------------------------\nI guess: {guess}\n")
-    return valued_words[0]
-
-def ask_user_for_guess( dictionary:list[str]) -> str:
+    # In hard mode, guesses come only from the words that use every hint.
+    ranking = None
+    if hard:
+        wordlist = hard_mode_guesses(wordlist, known, index)
+    if memo:
+        name = strategy
+        if strategy in ('lookahead', 'minimax'):
+            name += '/%d/%d' % (LOOKAHEAD_DEPTH, LOOKAHEAD_TOP_K)
+        if hard:
+            name += '/hard'
+        # The guesses allowed are part of the key: another --guesses
+        # list, or the hints in hard mode, can change them.
+        key = (name, words_digest(wordlist), known.fingerprint())
+        ranking = memo.get(key)
+    if ranking is None:
+        ranking = rank_guesses(wordlist, known, matrix, strategy)
+        if memo:
+            memo.put(key, ranking)
+    guess = ranking[0]
+    if verbose:
+        print( f"\n--------------------------\nI guess: {guess}\n")
+    return guess
+
+def ask_user_for_guess( dictionary:list[str], known:Knowledge=None, index:'WordIndex'=None) -> str:
     """Ask for a guess, make sure it's in dictionary."""
+    # Given known, it's hard mode: the guess must also use every hint.
+    legal = hard_mode_guesses(dictionary, known, index) if known else dictionary
+    legal = set(legal)
     done = False
     while not done:
         myguess = input( 'Guess: ').upper().strip()
-        if myguess in dictionary:
+        if myguess in legal:
             done = True
+        elif myguess in dictionary:
+            print( f"Word '{myguess}' {hard_mode_problem(myguess, known)}.")
         else:
             print( f"Word '{myguess}' not in dictionary.")
     return myguess
@@ -238,15 +606,17 @@ def space_str(string:str) -> str:
         s += c + ' '
     return s[:-1]
 
-def test_guess( solution:str, guess:str ) -> str:
+def test_guess( solution:str, guess:str, matrix:'FeedbackMatrix'=None ) -> str:
     """Returns result of matching guess against solution."""
-    # Return is 5-character string of HIT, PARTIAL, MISS characters.
+    # Return is string of HIT, PARTIAL, MISS characters, as long as guess.
     # Watch for oddball case where solution contains multiples of a letter
     # and the guess does too.
-    theresult = Knowledge.MISS * 5
     guess = guess.upper()
+    if matrix:
+        return code_result(matrix.code(guess, solution), len(guess))
+    theresult = Knowledge.MISS * len(guess)
     # Look for perfect hits
-    for pos in range(0,5):
+    for pos in range(0,len(guess)):
         if guess[pos] == solution[pos]:
             theresult = swap_chr(theresult, Knowledge.HIT, pos)
             solution = swap_chr(solution, ' ', pos)
@@ -257,7 +627,7 @@ def test_guess( solution:str, guess:str ) -> str:
     #   E..g. solution = START.  Guess 'BLUNT'
     #   NB: the error is in determining the result, not analysing it
     #   NB: the error is in this second loop
-    for pos in range(0,5):
+    for pos in range(0,len(guess)):
         if theresult[pos] == Knowledge.HIT:
             continue
         idx = solution.find(guess[pos])
@@ -267,24 +637,527 @@ def test_guess( solution:str, guess:str ) -> str:
         ##print( f"2: {pos=}, {guess[pos]=}, {idx=}, {solution=}, {guess=}, {theresult=}")
     return theresult
 
-def print_guess_result( solution:str, guess:str, result:str, known:Knowledge, guess_history:list[str], spelling_dictionary:list[str]):
+# Feedback patterns can be encoded as base-3 integers, one digit per
+# position (position 0 is the least significant digit), so that a
+# whole 5-letter result fits in a byte: MISS=0, PARTIAL=1, HIT=2.
+# Results of 6 to 10 letters take two bytes.
+CODE_DIGITS = {Knowledge.MISS: 0, Knowledge.PARTIAL: 1, Knowledge.HIT: 2}
+
+def result_code( result:str ) -> int:
+    """Returns the base-3 integer code of a result string."""
+    code = 0
+    for pos in range(0,len(result)):
+        code += CODE_DIGITS[result[pos]] * 3 ** pos
+    return code
+
+def code_result( code:int, length:int=WORD_LENGTH ) -> str:
+    """Returns the result string for a base-3 integer code."""
+    result = ''
+    for pos in range(0,length):
+        result += (Knowledge.MISS, Knowledge.PARTIAL, Knowledge.HIT)[code % 3]
+        code //= 3
+    return result
+
+def code_width( length:int ) -> int:
+    """Returns the bytes needed for the codes of length-letter results."""
+    return 1 if 3 ** length <= 256 else 2
+
+def encode_words( wordlist:list[str], length:int ) -> bytes:
+    """Returns wordlist as fixed-width rows of uint8, one row per word."""
+    rows = ''.join(wordlist).encode('ascii')
+    if len(rows) != length * len(wordlist):
+        raise ValueError(f"Words must all have {length} letters")
+    return rows
+
+def build_feedback_data( guesses:list[str], solutions:list[str], length:int=WORD_LENGTH ):
+    """Returns feedback codes of every guess against every solution."""
+    # Row-major, one code per (guess, solution): bytes, or an array of
+    # uint16 if codes need two bytes.  Rather than looping over every
+    # pair, each row is built from big integers that hold one code per
+    # solution.  No code ever exceeds all hits, so adding or subtracting
+    # these integers never carries between solutions.
+    n = len(solutions)
+    width = code_width(length)
+    if not n:
+        return b'' if width == 1 else array('H')
+    ones = int.from_bytes((b'\0' * (width-1) + b'\x01') * n, 'big')
+    positive = bytes([0] + [1] * 255)   # translate table: byte > 0 -> 1
+    # at[pos][ltr] has 1 for each solution with ltr at pos.
+    # tally[ltr] has the number of times ltr occurs in each solution.
+    rows = encode_words(solutions, length)
+    at = []
+    for pos in range(0,length):
+        column = rows[pos::length]
+        at.append({})
+        for ltr in ALPHABET:
+            table = bytes(1 if chr(b) == ltr else 0 for b in range(256))
+            spread = bytearray(n * width)
+            spread[width-1::width] = column.translate(table)
+            at[pos][ltr] = int.from_bytes(spread, 'big')
+    tally = {}
+    for ltr in ALPHABET:
+        tally[ltr] = sum(at[pos][ltr] for pos in range(0,length))
+
+    data = bytearray()
+    for guess in guesses:
+        row = 0
+        for ltr in set(guess):
+            positions = [pos for pos in range(0,length) if guess[pos] == ltr]
+            # How many of ltr in each solution are not used up by hits.
+            unused = tally[ltr] - sum(at[pos][ltr] for pos in positions)
+            partials = 0
+            # Partials go to the leftmost non-hit positions first.
+            for pos in positions:
+                hit = at[pos][ltr]
+                left = (unused - partials).to_bytes(n * width, 'big').translate(positive)
+                partial = int.from_bytes(left, 'big') & (ones - hit)
+                partials += partial
+                row += 3 ** pos * (2 * hit + partial)
+        data += row.to_bytes(n * width, 'big')
+    if width == 1:
+        return bytes(data)
+    codes = array('H', bytes(data))
+    if sys.byteorder == 'little':
+        codes.byteswap()
+    return codes
+
+class FeedbackMatrix():
+    """Precomputed feedback codes of every guess against every solution."""
+
+    def __init__(self, guesses:list[str], solutions:list[str], data:bytes=None) -> None:
+        self.guesses = list(guesses)
+        self.solutions = list(solutions)
+        self.length = len(self.guesses[0]) if self.guesses else WORD_LENGTH
+        self.all_hits = 3 ** self.length - 1    # Code of a solved result
+        self.guess_index = {w: i for i, w in enumerate(self.guesses)}
+        self.solution_index = {w: i for i, w in enumerate(self.solutions)}
+        if data is None:
+            data = build_feedback_data(self.guesses, self.solutions, self.length)
+        self.data = data    # len(guesses) * len(solutions) codes, row by guess
+        self.priors = None  # Prior of each solution, if known (see rank_priors)
+
+    def row(self, guess:str):
+        """Returns the codes of guess against all solutions (or None)."""
+        if guess not in self.guess_index:
+            return None
+        n = len(self.solutions)
+        start = self.guess_index[guess] * n
+        return self.data[start:start+n]
+
+    def code(self, guess:str, solution:str) -> int:
+        """Returns the feedback code for guess against solution."""
+        # Words outside the matrix (e.g. a solution the user added for
+        # the session) fall back to working out the result the slow way.
+        if guess in self.guess_index and solution in self.solution_index:
+            return self.data[self.guess_index[guess] * len(self.solutions)
+                    + self.solution_index[solution]]
+        return result_code(test_guess(solution, guess))
+
+    def codes(self, guess:str, wordlist:list[str]) -> list[int]:
+        """Returns the feedback codes for guess against each of wordlist."""
+        row = self.row(guess)
+        if row is not None:
+            # Words that aren't solutions are worked out one by one.
+            idx = self.solution_index
+            return [row[idx[w]] if w in idx else self.code(guess, w) for w in wordlist]
+        return [self.code(guess, w) for w in wordlist]
+
+    def prior(self, word:str) -> float:
+        """Returns the prior chance of word being the solution."""
+        if self.priors is None:
+            return 1.0
+        if word not in self.solution_index:
+            return FREQUENCY_FLOOR
+        return self.priors[self.solution_index[word]]
+
+    def pattern_counts(self, guess:str, wordlist:list[str]) -> Counter:
+        """Returns how many of wordlist would give each feedback code."""
+        return Counter(self.codes(guess, wordlist))
+
+    def gatherer(self, wordlist:list[str]):
+        """Returns a function picking wordlist's codes out of a row (or None)."""
+        # itemgetter does the picking in C, which is what makes scoring
+        # every guess against every candidate affordable.
+        idx = self.solution_index
+        if not wordlist or any(w not in idx for w in wordlist):
+            return None
+        if wordlist == self.solutions:
+            return lambda row: row
+        if len(wordlist) == 1:
+            only = idx[wordlist[0]]
+            return lambda row: (row[only],)
+        return itemgetter(*[idx[w] for w in wordlist])
+
+def entropy_scores( matrix:FeedbackMatrix, guesses:list[str], wordlist:list[str] ) -> dict[str:float]:
+    """Returns dict of guess:bits of information expected about wordlist."""
+    # Entropy of the partition of wordlist by feedback code, i.e.
+    # log2(n) - sum(c * log2(c)) / n over the count c of each code.
+    n = len(wordlist)
+    if not n:
+        return {g: 0.0 for g in guesses}
+    clogc = [0.0] + [c * log2(c) for c in range(1, n+1)]
+    gather = matrix.gatherer(wordlist)
+    scores = {}
+    for guess in guesses:
+        row = matrix.row(guess)
+        if gather and row is not None:
+            counts = Counter(gather(row))
+        else:
+            counts = matrix.pattern_counts(guess, wordlist)
+        scores[guess] = log2(n) - sum(map(clogc.__getitem__, counts.values())) / n
+    return scores
+
+def possible_solutions( spelling_dictionary:list[str], matrix:FeedbackMatrix=None,
+        solution:str=None ) -> list[str]:
+    """Returns the words that could be the solution before the first guess."""
+    # With a matrix, its solutions, as every possibility then has its
+    # codes in the matrix and scoring stays on the fast path.  Guesses
+    # outside them are still made, just never taken for the solution.  A
+    # solution given from elsewhere is added in case it isn't among them.
+    if not matrix:
+        return spelling_dictionary
+    words = matrix.solutions
+    if solution and solution not in matrix.solution_index:
+        words = words + [solution]
+    return words
+
+def rank_priors( solution_rank, ranked:int ) -> array:
+    """Returns prior of each solution given its frequency rank (or -1)."""
+    priors = array('d')
+    for rank in solution_rank:
+        if rank < 0:
+            rank = ranked
+        weight = 1 / (1 + exp(min(700, (rank - FREQUENCY_MIDPOINT) / FREQUENCY_WIDTH)))
+        priors.append(max(FREQUENCY_FLOOR, weight))
+    return priors
+
+def expected_guesses( matrix:FeedbackMatrix, guesses:list[str], wordlist:list[str] ) -> dict[str:float]:
+    """Returns dict of guess:expected number of guesses to solve wordlist."""
+    # With p the chance that guess is the solution, and H the bits of
+    # uncertainty left once its result is known, the estimate is
+    #   p * 1 + (1 - p) * (2 + H / BITS_PER_GUESS)
+    # Chances come from word frequency, so common words count for more.
+    gather = matrix.gatherer(wordlist)
+    if gather and matrix.priors is not None:
+        weights = gather(matrix.priors)
+    else:
+        weights = [matrix.prior(w) for w in wordlist]
+    total = sum(weights)
+    if not total:
+        return {g: 0.0 for g in guesses}
+    weights = [w / total for w in weights]
+    chance = dict(zip(wordlist, weights))
+    uncertainty = -sum(w * log2(w) for w in weights if w > 0)
+    scores = {}
+    for guess in guesses:
+        row = matrix.row(guess)
+        if gather and row is not None:
+            codes = gather(row)
+        else:
+            codes = matrix.codes(guess, wordlist)
+        buckets = [0.0] * (matrix.all_hits + 1)
+        for code, weight in zip(codes, weights):
+            buckets[code] += weight
+        info = -sum(b * log2(b) for b in buckets if b > 0)
+        p = chance.get(guess, 0.0)
+        left = max(0.0, uncertainty - info)
+        scores[guess] = p + (1 - p) * (2 + left / BITS_PER_GUESS)
+    return scores
+
+def most_likely_words(wordlist:list[str], known:Knowledge, matrix:FeedbackMatrix=None) -> list[str]:
+    """Returns list of words, fewest expected guesses first."""
+    if matrix is None:
+        matrix = FeedbackMatrix(wordlist, known.wordlist)
+    scores = expected_guesses(matrix, wordlist, known.wordlist)
+    possible = set(known.wordlist)
+    return sorted(wordlist, key=lambda w: (scores[w], w not in possible))
+
+def set_lookahead( depth:int=None, top_k:int=None, budget:float=None ):
+    """Changes the look-ahead search settings for this process."""
+    global LOOKAHEAD_DEPTH, LOOKAHEAD_TOP_K, LOOKAHEAD_BUDGET
+    if depth is not None:
+        LOOKAHEAD_DEPTH = max(1, depth)
+    if top_k is not None:
+        LOOKAHEAD_TOP_K = max(1, top_k)
+    if budget is not None:
+        LOOKAHEAD_BUDGET = budget
+
+def lookahead_settings() -> tuple[int, int, float]:
+    """Returns the look-ahead settings, as arguments for set_lookahead."""
+    return LOOKAHEAD_DEPTH, LOOKAHEAD_TOP_K, LOOKAHEAD_BUDGET
+
+class OutOfTime(Exception):
+    """The look-ahead search ran past its deadline."""
+
+class LookaheadSearch():
+    """Depth-limited search for the guess that solves soonest."""
+    # Words are solution indices into the matrix.  Costs add up the
+    # guesses needed for every word ('expected', n times the mean), or
+    # take the most needed for any ('worst').  A guess is dropped as soon
+    # as its cost reaches the best found so far at that step.
+
+    def __init__(self, matrix:FeedbackMatrix, objective:str, top_k:int, deadline:float,
+            guesses:list[str]) -> None:
+        self.matrix = matrix
+        self.worst = objective == 'worst'
+        self.top_k = top_k
+        self.deadline = deadline
+        self.guesses = guesses  # Guesses worth trying anywhere
+
+    def partition(self, guess:str, idx:list[int]) -> dict[int:list[int]]:
+        """Returns dict of code:words in idx giving that code for guess."""
+        row = self.matrix.row(guess)
+        parts = {}
+        for i in idx:
+            parts.setdefault(row[i], []).append(i)
+        return parts
+
+    def estimate(self, n:int) -> float:
+        """Returns a guess at the cost of solving n words, without search."""
+        # Same rough reckoning as expected_guesses.
+        if self.worst:
+            return 2 + log2(n) / BITS_PER_GUESS
+        return 1 + (n - 1) * (2 + log2(n) / BITS_PER_GUESS)
+
+    def guess_cost(self, guess:str, idx:list[int], depth:int, bound:float) -> float:
+        """Returns cost of solving idx starting with guess, or inf if >= bound."""
+        parts = self.partition(guess, idx)
+        if len(parts) == 1 and self.matrix.all_hits not in parts:
+            return inf      # Learns nothing
+        cost = 0
+        for code, words in sorted(parts.items(), key=lambda x: -len(x[1])):
+            if code == self.matrix.all_hits:
+                part = 1
+            elif self.worst:
+                part = 1 + self.solve_cost(words, depth)
+            else:
+                part = len(words) + self.solve_cost(words, depth)
+            cost = max(cost, part) if self.worst else cost + part
+            if cost >= bound:
+                return inf
+        return cost
+
+    def solve_cost(self, idx:list[int], depth:int) -> float:
+        """Returns cost of solving idx with the best guess."""
+        if time.perf_counter() > self.deadline:
+            raise OutOfTime()
+        n = len(idx)
+        if n == 1:
+            return 1
+        if n == 2:
+            return 2 if self.worst else 3
+        if depth <= 0:
+            return self.estimate(n)
+        best = inf
+        for guess in self.candidates(idx):
+            best = min(best, self.guess_cost(guess, idx, depth - 1, best))
+        return best
+
+    def candidates(self, idx:list[int]) -> list[str]:
+        """Returns the top_k guesses worth trying against idx."""
+        if time.perf_counter() > self.deadline:
+            raise OutOfTime()
+        # Words that could be the solution, and the guesses that were
+        # best to begin with, ranked by how many ways they split idx.
+        pool = [self.matrix.solutions[i] for i in idx] + self.guesses
+        pool = [g for g in dict.fromkeys(pool) if g in self.matrix.guess_index]
+        gather = itemgetter(*idx)
+        splits = {g: len(set(gather(self.matrix.row(g)))) for g in pool}
+        return sorted(pool, key=lambda g: -splits[g])[:self.top_k]
+
+def lookahead_words(wordlist:list[str], known:Knowledge, matrix:FeedbackMatrix=None,
+        objective:str='expected') -> list[str]:
+    """Returns list of words, fewest guesses to solve by look-ahead first."""
+    # Falls back on the entropy ranking if the search can't be done or
+    # the turn runs out of time before any guess is tried through.  The
+    # time counts from here, entropy ranking included.
+    deadline = time.perf_counter() + LOOKAHEAD_BUDGET
+    greedy = most_informative_words(wordlist, known, matrix)
+    if matrix is None or len(known.wordlist) <= 2 or time.perf_counter() > deadline:
+        return greedy
+    if any(w not in matrix.solution_index for w in known.wordlist):
+        return greedy
+    idx = [matrix.solution_index[w] for w in known.wordlist]
+    possible = set(known.wordlist)
+    top = [g for g in greedy if g in matrix.guess_index][:LOOKAHEAD_TOP_K]
+    top += [g for g in greedy if g in possible and g in matrix.guess_index
+            and g not in top][:LOOKAHEAD_TOP_K // 2]
+    search = LookaheadSearch(matrix, objective, LOOKAHEAD_TOP_K, deadline, top)
+    costs = {}
+    best = inf
+    try:
+        for guess in top:
+            costs[guess] = search.guess_cost(guess, idx, LOOKAHEAD_DEPTH - 1, best)
+            best = min(best, costs[guess])
+    except OutOfTime:
+        pass
+    if not costs or best == inf:
+        return greedy
+    ranked = sorted(costs, key=lambda g: (costs[g], g not in possible))
+    return ranked + [w for w in greedy if w not in costs]
+
+def most_informative_words(wordlist:list[str], known:Knowledge, matrix:FeedbackMatrix=None) -> list[str]:
+    """Returns list of words, most expected information first."""
+    # Among equally informative guesses, prefer ones that could be the
+    # solution.
+    if matrix is None:
+        matrix = FeedbackMatrix(wordlist, known.wordlist)
+    scores = entropy_scores(matrix, wordlist, known.wordlist)
+    possible = set(known.wordlist)
+    return sorted(wordlist, key=lambda w: (scores[w], w in possible), reverse=True)
+
+# Layout of CACHE_FILE: magic, sha256 of the source files and word
+# length, the word length, then the byte length of each section.
+# Sections are padded to 8 bytes.  Lists too big for a feedback matrix
+# (see MATRIX_LIMIT), or of words too long for one (see
+# MATRIX_MAX_LENGTH), have an empty matrix section.
+CACHE_MAGIC = b'WORDLE02'
+CACHE_HEADER = struct.Struct('<8s32s7Q')
+
+class WordCache():
+    """Word lists, their index mappings and feedback matrix, from one file."""
+
+    def __init__(self, solutions:list[str], guesses:list[str], frequency:list[str],
+            guess_solution, solution_rank, matrix:FeedbackMatrix, length:int=WORD_LENGTH) -> None:
+        self.length = length
+        self.solutions = solutions
+        self.guesses = guesses
+        self.frequency = frequency
+        self.guess_solution = guess_solution  # guess idx -> solution idx, or -1
+        self.solution_rank = solution_rank    # solution idx -> frequency rank, or -1
+        self.matrix = matrix        # None if the lists are too big
+
+def source_digest( files:list[str], length:int=WORD_LENGTH ) -> bytes:
+    """Returns sha256 of the contents of files, for words of length."""
+    digest = hashlib.sha256()
+    digest.update(struct.pack('<Q', length))
+    for name in files:
+        with open(name, 'rb') as f:
+            content = f.read()
+        digest.update(struct.pack('<Q', len(content)))
+        digest.update(content)
+    return digest.digest()
+
+def build_cache( files:list[str], length:int=WORD_LENGTH ) -> WordCache:
+    """Builds the word cache contents from the source files."""
+    solutions_file, guesses_file, frequency_file = files
+    solutions = load_wordlist(solutions_file, length)
+    guesses = load_wordlist(guesses_file, length)
+    frequency = load_wordlist(frequency_file, length)
+    solution_index = {}
+    for i, w in enumerate(solutions):
+        solution_index.setdefault(w, i)
+    rank = {}
+    for i, w in enumerate(frequency):
+        rank.setdefault(w, i)
+    guess_solution = array('i', [solution_index.get(w, -1) for w in guesses])
+    solution_rank = array('i', [rank.get(w, -1) for w in solutions])
+    matrix = None
+    if length <= MATRIX_MAX_LENGTH and len(guesses) * len(solutions) <= MATRIX_LIMIT:
+        matrix = FeedbackMatrix(guesses, solutions)
+        matrix.priors = rank_priors(solution_rank, len(frequency))
+    return WordCache(solutions, guesses, frequency, guess_solution, solution_rank, matrix,
+            length)
+
+def write_cache( path:str, digest:bytes, cache:WordCache ):
+    """Writes cache to path, replacing any older file atomically."""
+    sections = [
+        '\n'.join(cache.solutions).encode(),
+        '\n'.join(cache.guesses).encode(),
+        '\n'.join(cache.frequency).encode(),
+        cache.guess_solution.tobytes(),
+        cache.solution_rank.tobytes(),
+        bytes(cache.matrix.data) if cache.matrix else b'',
+        ]
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, digest, cache.length,
+                *[len(x) for x in sections]))
+        for section in sections:
+            f.write(section)
+            f.write(b'\0' * (-len(section) % 8))
+    os.replace(tmp, path)
+
+def read_cache( path:str, digest:bytes ):
+    """Returns WordCache mapped from path, or None if missing or stale."""
+    # The file is mmap'd read-only, so every solver process using it
+    # shares the same pages rather than holding its own copy.
+    try:
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    if len(mm) < CACHE_HEADER.size:
+        return None
+    magic, found, word_length, *lengths = CACHE_HEADER.unpack_from(mm)
+    if magic != CACHE_MAGIC or found != digest:
+        return None
+    view = memoryview(mm)
+    sections = []
+    offset = CACHE_HEADER.size
+    for length in lengths:
+        if offset + length > len(mm):
+            return None
+        sections.append(view[offset:offset+length])
+        offset += length + (-length % 8)
+    solutions, guesses, frequency = [bytes(x).decode().split('\n') if x else []
+            for x in sections[:3]]
+    solution_rank = sections[4].cast('i')
+    matrix = None
+    if sections[5]:
+        data = sections[5]
+        if code_width(word_length) > 1:
+            data = data.cast('H')
+        matrix = FeedbackMatrix(guesses, solutions, data)
+        matrix.priors = rank_priors(solution_rank, len(frequency))
+    return WordCache(solutions, guesses, frequency,
+            sections[3].cast('i'), solution_rank, matrix, word_length)
+
+def load_cache( path:str=CACHE_FILE,
+        files:list[str]=(SOLUTIONS_FILE, GUESSES_FILE, FREQUENCY_FILE),
+        length:int=WORD_LENGTH ) -> WordCache:
+    """Returns the word cache, rebuilding it if any source file changed."""
+    digest = source_digest(files, length)
+    cache = read_cache(path, digest)
+    if cache:
+        return cache
+    cache = build_cache(files, length)
+    try:
+        write_cache(path, digest, cache)
+    except OSError as e:
+        print( f"Could not write cache {path}: {e}")
+        return cache
+    return read_cache(path, digest) or cache
+
+def print_guess_result( guess:str, result:str, known:Knowledge, spelling_dictionary:list[str],
+        verbosity:str='full'):
     """Print the current state of guesswork."""
+    # verbosity is one of VERBOSITY.  Earlier results come from the
+    # history in known, and the letter values are worked out once, their
+    # letter counts coming from letter_stats and the guesses' values from
+    # valued_list, both of which the next guess will reuse.
+    if verbosity == 'none':
+        print( f"{space_str(guess)}\n{space_str(result)}")
+        return
     print( "\n\n\n")
     alpha_what = ''
     for c in ALPHABET:
         alpha_what += known.alpha_status[c]
-    for s in guess_history:
-        print( f"{space_str(s)}")
-        print( f"{space_str(test_guess(solution, s))}\n")
+    for past, past_result in known.history[:-1]:
+        print( f"{space_str(past)}")
+        print( f"{space_str(past_result)}\n")
     print( f"{space_str(guess)}     {space_str(ALPHABET)}")
     print( f"{space_str(result)}     {space_str(alpha_what)}")
     print( f"List of possibilities has {len(known.wordlist)} items")
-    if len(known.wordlist) < 20:
+    if len(known.wordlist) < CANDIDATES_SHOWN:
         print(known.wordlist)
+    if verbosity == 'summary':
+        return
     ##print( f"Most likely letters: {count_frequences(mylist,'')}")
     print( f"Most likely remaining letters: "
             f"{count_frequences(known.wordlist,known.alpha_not+known.alpha_known)}")
-    print( f"Most valued letters: {most_valued_letters(known)}")
+    vl = valued_str( known.wordlist, ALPHABET, known.alpha_count)
+    print( f"Most valued letters: {most_valued_letters(known, vl)}")
     valued_words = most_valued_words(spelling_dictionary,known)
     print( f"Most valued guesses: ", end='')
     for idx in range(0,min(4,len(valued_words))):
@@ -292,7 +1165,6 @@ def print_guess_result( solution:str, guess:str, result:str, known:Knowledge, gu
     print()
 
     # Show values for most-valued letters as a indicator of Rhyming Problem
-    vl = valued_str( known.wordlist, ALPHABET, known.alpha_count)
     for ltr in sorted(vl.keys()):
         if vl[ltr] < 1:
             continue
@@ -312,11 +1184,137 @@ def print_guess_result( solution:str, guess:str, result:str, known:Knowledge, gu
             print( f"{ch}:{known.alpha_count[ch]} ", end='')
     print()
 
-def prune_list( start_list:list[str], known:Knowledge ) -> list[str]:
+class WordIndex():
+    """Bitsets over a word list, for pruning it to what's known."""
+    # Bit i of each bitset stands for self.words[i].
+
+    def __init__(self, wordlist:list[str], length:int=None) -> None:
+        self.words = list(wordlist)
+        self.length = length or (len(self.words[0]) if self.words else WORD_LENGTH)
+        self.position = {}
+        for i, w in enumerate(self.words):
+            self.position.setdefault(w, i)
+        self.all = (1 << len(self.words)) - 1
+        # at[pos][ltr]: words with ltr at pos.
+        # at_least[ltr][n]: words with at least n of ltr.
+        # Each column of the uint8 rows becomes a string of '0' and '1'
+        # for each letter, which int() turns into a bitset in one go.
+        rows = encode_words(self.words, self.length)
+        self.at = []
+        for pos in range(0,self.length):
+            column = rows[pos::self.length]
+            self.at.append({})
+            for ltr in ALPHABET:
+                table = bytes.maketrans(ALPHABET.encode(),
+                        ''.join('1' if c == ltr else '0' for c in ALPHABET).encode())
+                self.at[pos][ltr] = int(b'0' + column.translate(table)[::-1], 2)
+        self.at_least = {}
+        for ltr in ALPHABET:
+            at_least = [self.all] + [0] * self.length
+            for pos in range(0,self.length):
+                for n in range(self.length, 0, -1):
+                    at_least[n] |= at_least[n-1] & self.at[pos][ltr]
+            self.at_least[ltr] = at_least
+
+    def mask(self, known:Knowledge) -> int:
+        """Returns bitset of words that fit what's known."""
+        # Same rules as the regular expressions in prune_list.
+        mask = self.all
+        for pos in range(0,self.length):
+            if known.position_known[pos]:
+                mask &= self.at[pos][known.position_known[pos]]
+            else:
+                for ltr in set(known.position_not[pos] + known.alpha_not):
+                    mask &= ~self.at[pos][ltr]
+        for ltr in ALPHABET:
+            count = known.alpha_count[ltr]
+            if count > self.length:
+                return 0
+            if count > 0:
+                mask &= self.at_least[ltr][count]
+        return mask
+
+    def hard_mask(self, known:Knowledge) -> int:
+        """Returns bitset of words hard mode allows as the next guess."""
+        # Hits must stay put and letters found be used as often as found,
+        # but misses and moved letters may be guessed again.
+        mask = self.all
+        for pos in range(0,self.length):
+            if known.position_known[pos]:
+                mask &= self.at[pos][known.position_known[pos]]
+        for ltr in ALPHABET:
+            count = known.alpha_count[ltr]
+            if count > self.length:
+                return 0
+            if count > 0:
+                mask &= self.at_least[ltr][count]
+        return mask
+
+    def members(self, wordlist:list[str]) -> int:
+        """Returns bitset of the words in wordlist."""
+        if wordlist == self.words:
+            return self.all
+        bits = bytearray(b'0' * len(self.words))
+        for w in wordlist:
+            if w in self.position:
+                bits[self.position[w]] = ord('1')
+        return int(b'0' + bits[::-1], 2)
+
+    def words_in(self, mask:int) -> list[str]:
+        """Returns the words in bitset mask, in index order."""
+        bits = bin(mask)[:1:-1]
+        found = []
+        i = bits.find('1')
+        while i != -1:
+            found.append(self.words[i])
+            i = bits.find('1', i+1)
+        return found
+
+def prune_list( start_list:list[str], known:Knowledge, matrix:FeedbackMatrix=None,
+        index:WordIndex=None ) -> list[str]:
     """Returns a word list, pruned to possible solutions."""
+    # With a word index, what's known becomes a few bitset ANDs.  Words
+    # missing from the index go through the regular expressions below.
+    if index:
+        extras = [w for w in start_list if w not in index.position]
+        pruned = index.words_in(index.mask(known) & index.members(start_list))
+        if extras:
+            pruned += prune_list(extras, known)
+    else:
+        pruned = prune_regex(start_list, known)
+    # With a feedback matrix, keep just the words that would have given
+    # the same result for every guess so far.
+    if matrix:
+        for guess, result in known.history:
+            code = result_code(result)
+            pruned = [w for w, c in zip(pruned, matrix.codes(guess, pruned)) if c == code]
+    return pruned
+
+def hard_mode_problem( word:str, known:Knowledge ) -> str:
+    """Returns why hard mode won't allow word as the next guess, or None."""
+    for pos in range(0,known.length):
+        if known.position_known[pos] and word[pos] != known.position_known[pos]:
+            return f"must have {known.position_known[pos]} in position {pos+1}"
+    for ltr in ALPHABET:
+        if word.count(ltr) < known.alpha_count[ltr]:
+            return f"must use {ltr} {known.alpha_count[ltr]} time(s)"
+    return None
+
+def hard_mode_guesses( dictionary:list[str], known:Knowledge, index:WordIndex=None ) -> list[str]:
+    """Returns the words in dictionary hard mode allows as the next guess."""
+    # Same bitsets as prune_list, checking words missing from the index
+    # one by one.
+    if not index:
+        return [w for w in dictionary if hard_mode_problem(w, known) is None]
+    extras = [w for w in dictionary if w not in index.position]
+    allowed = index.words_in(index.hard_mask(known) & index.members(dictionary))
+    return allowed + [w for w in extras if hard_mode_problem(w, known) is None]
+
+def prune_regex( start_list:list[str], known:Knowledge ) -> list[str]:
+    """Returns a word list, pruned by regular expressions."""
     # Make a reg expression, position by position
     re_str = ''
-    for pos in range(0,5):
+    for pos in range(0,known.length):
         # Do we know the very letter this must be?
         if known.position_known[pos]:
             re_str += known.position_known[pos]
@@ -363,44 +1361,99 @@ def is_solved(solution, guess) -> bool:
     return guess == solution
 
 
+class LetterStats():
+    """Letter counts over a word list, worked out in one go."""
+
+    def __init__(self, wordlist:list[str]) -> None:
+        # Everything comes from C-level passes over the columns of the
+        # joined list, rather than Python loops over words and letters.
+        length = len(wordlist[0]) if wordlist else WORD_LENGTH
+        joined = ''.join(wordlist)
+        self.size = len(wordlist)
+        self.at = []            # per position, Counter of letters there
+        self.count = {}         # A..Z, occurances in all words
+        self.words_with = {}    # A..Z, number of words containing letter
+        for pos in range(0,length):
+            self.at.append(Counter(joined[pos::length]))
+        for ltr in ALPHABET:
+            self.count[ltr] = sum(at[ltr] for at in self.at)
+            # A '1' per word with ltr at a position; OR the positions.
+            table = str.maketrans(ALPHABET, ''.join('1' if c == ltr else '0' for c in ALPHABET))
+            with_ltr = 0
+            if self.count[ltr]:
+                for pos in range(0,length):
+                    if self.at[pos][ltr]:
+                        with_ltr |= int(joined[pos::length].translate(table), 2)
+            self.words_with[ltr] = with_ltr.bit_count()
+
+# Stats of the most recent word lists, so that everything in a turn
+# that looks at the same list shares one LetterStats.
+_letter_stats = OrderedDict()
+
+def letter_stats( wordlist:list[str] ) -> LetterStats:
+    """Returns LetterStats for wordlist, reusing any already worked out."""
+    # Keyed by identity: lists are only ever replaced or appended to,
+    # never changed in place.  The entry keeps the list alive so its id
+    # can't be reused.
+    key = (id(wordlist), len(wordlist))
+    entry = _letter_stats.get(key)
+    if entry and entry[0] is wordlist:
+        _letter_stats.move_to_end(key)
+        CACHE_STATS['letter_stats_hits'] += 1
+        return entry[1]
+    CACHE_STATS['letter_stats_misses'] += 1
+    stats = LetterStats(wordlist)
+    _letter_stats[key] = (wordlist, stats)
+    while len(_letter_stats) > 8:
+        _letter_stats.popitem(last=False)
+    return stats
+
 def valued_str( wordlist: list[str], alpha:str, alpha_known_count:dict[str:int] ) -> dict[str:int]:
     """Returns dict of letter:value for alpha letters in wordlist."""
     # Assigns each letter in alpha a value (measure of desirability) based
     # on its number of occurances in wordlist.  For letters already known, the
     # value per owrd of a letter's score is reduced by the # of letters known.
+    stats = letter_stats(wordlist)
     ltr_count = {}
-    words_with_ltr = {}
-    for alpha_ltr in alpha:
-        ltr_count[alpha_ltr] = 0
-        words_with_ltr[alpha_ltr] = 0
-
     for alpha_ltr in alpha:
-        for word in wordlist:
-            if alpha_ltr in word:
-                words_with_ltr[alpha_ltr] += 1
-
-    for word in wordlist:
-        for word_ltr in word:
-            ltr_count[word_ltr] += 1
+        ltr_count[alpha_ltr] = stats.count[alpha_ltr]
 
     # Reduce score for each letter that we already know.
     for alpha_ltr in alpha:
         if alpha_ltr in alpha_known_count:
             ltr_count[alpha_ltr] -= max(0,
                 max(0,alpha_known_count[alpha_ltr])
-                * words_with_ltr[alpha_ltr] )
+                * stats.words_with[alpha_ltr] )
 
     return ltr_count
 
 
+_valued_lists = OrderedDict()
+
 def valued_list(wordlist:list[str], known:Knowledge) -> dict[str:int]:
     """Returns dict of word:value given wordlist and dict of letter values."""
+    # Kept for wordlist (by identity, as for letter_stats) and what's
+    # known, so the values shown after a guess are reused for choosing the
+    # next one.  Callers mustn't change the dict.
+    key = (id(wordlist), len(wordlist), known.fingerprint())
+    entry = _valued_lists.get(key)
+    if entry and entry[0] is wordlist:
+        _valued_lists.move_to_end(key)
+        return entry[1]
+    vlist = word_values(wordlist, known)
+    _valued_lists[key] = (wordlist, vlist)
+    while len(_valued_lists) > 8:
+        _valued_lists.popitem(last=False)
+    return vlist
+
+def word_values(wordlist:list[str], known:Knowledge) -> dict[str:int]:
+    """Returns dict of word:value for the possibilities, letters valued over wordlist."""
     multi_penalty = 0
     letter_val = valued_str(wordlist, ALPHABET, known.alpha_count)
     vlist = {}
     for word in known.wordlist:
         vlist[word] = 0
-        for idx in range(0,5):
+        for idx in range(0,len(word)):
             ltr = word[idx]
             # Apply a penalty to letters that are already in the word.
             if word.find(ltr,0,idx) < 0:
@@ -418,9 +1471,11 @@ def most_valued_words(wordlist:list[str], known:Knowledge) -> list[str]:
         val_word_list += [x for x in val_word_dict[val]]
     return val_word_list
 
-def most_valued_letters(known:Knowledge) -> str:
+def most_valued_letters(known:Knowledge, letter_val:dict[str:int]=None) -> str:
     """Return ordered string of highest-impact letters."""
-    letter_val = valued_str(known.wordlist, ALPHABET, known.alpha_count)
+    # letter_val is valued_str of the possibilities, if already worked out.
+    if letter_val is None:
+        letter_val = valued_str(known.wordlist, ALPHABET, known.alpha_count)
     val_letter = flip_dictionary(letter_val)
     ltr_str = ''
     for val in reversed(sorted(val_letter)):
@@ -445,13 +1500,7 @@ def flip_dictionary( dict_in:dict ) -> dict[any:list[str]]:
 def count_frequences( wordlist:list[str], without:str ) -> str:
     """Returns a string of letters in wordlist starting with most freq."""
 
-    ltrk = {}
-    for ltr in ALPHABET:
-        ltrk[ltr] = 0
-    for w in wordlist:
-        for ltr in ALPHABET:
-            if ltr in w:
-                ltrk[ltr] += 1
+    ltrk = dict(letter_stats(wordlist).words_with)
     # Reverse sort on frequency
     freq_dict = dict(sorted(ltrk.items(), key=lambda x: x[1], reverse=True))
     freq_str = ''
@@ -472,79 +1521,1099 @@ def list_reduction( solution:str, testguess:str, testknown:Knowledge) -> int:
     end_size = len(testknown.wordlist)
     return start_size - end_size
 
+def get_option( name:str, default:str=None ) -> str:
+    """Returns value of '--name=value' on the command line, or default."""
+    for arg in sys.argv[1:]:
+        if arg.startswith(f"--{name}="):
+            return arg[len(name)+3:]
+    return default
+
+def get_flag( name:str ) -> bool:
+    """Returns True if '--name' is on the command line."""
+    return f"--{name}" in sys.argv[1:]
+
+def get_args() -> list[str]:
+    """Returns the command line arguments that are not --options."""
+    return [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+
 def does_the_human_guess() -> bool:
     """Returns True if computer generates a solution, False if humans do. """
     # Default is True (computer)
-    if len(sys.argv) <= 1:
+    args = get_args()
+    if not args:
         return True
-    thisarg = sys.argv[1].strip().upper()
+    thisarg = args[0].strip().upper()
     ##print(f"{sys.argv=}, {thisarg=}")
     target = 'HUMAN'[0:len(thisarg)]
     if target == thisarg:
         return False
     return True
 
-def do_human_guessing(solution:str, spelling_dictionary:list[str]):
+def do_human_guessing(solution:str, spelling_dictionary:list[str], matrix:FeedbackMatrix=None,
+        index:WordIndex=None, hard:bool=False, verbosity:str='full'):
     """One game with the human guessing."""
     spelling_dictionary = merge_lists(spelling_dictionary, [solution])
-    known = Knowledge(spelling_dictionary)
+    known = Knowledge(possible_solutions(spelling_dictionary, matrix, solution))
 
-    print( f"There are {len(known.wordlist)} possible words.")
-    print( f"Most likely letters: {count_frequences(known.wordlist,'')}")
+    if verbosity != 'none':
+        print( f"There are {len(known.wordlist)} possible words.")
+        print( f"Most likely letters: {count_frequences(known.wordlist,'')}")
 
-    guess_history = []
     guess = ''
     while not is_solved(solution, guess):
-        guess = ask_user_for_guess(spelling_dictionary)
-        result = test_guess(solution, guess)
+        guess = ask_user_for_guess(spelling_dictionary, known if hard else None, index)
+        result = test_guess(solution, guess, matrix)
         known.update(guess, result)
-        known.wordlist = prune_list(known.wordlist, known)
+        known.wordlist = prune_list(known.wordlist, known, matrix, index)
         if solution not in known.wordlist:
             print( "Have a problem! solution no longer in the maybe_words!")
-        print_guess_result(solution, guess, result, known, guess_history, spelling_dictionary)
-        guess_history.append(guess)
-    print(f"Solved in {len(guess_history)} guesses.")
+        print_guess_result(guess, result, known, spelling_dictionary, verbosity)
+        PROFILER.end_turn(len(known.wordlist))
+    print(f"Solved in {len(known.history)} guesses.")
+
+def adversarial_result(guess:str, wordlist:list[str], matrix:FeedbackMatrix=None) -> str:
+    """Returns the result for guess that leaves the most of wordlist possible."""
+    # Ties go to the result with the fewest hits, then fewest partials.
+    # Without a matrix, or for words it lacks, results are worked out
+    # word by word.
+    length = len(guess)
+    if matrix and all(w in matrix.solution_index for w in wordlist):
+        buckets = Counter(matrix.codes(guess, wordlist))
+    else:
+        buckets = Counter(result_code(test_guess(w, guess)) for w in wordlist)
+    def rank(code:int) -> tuple[int, int, int]:
+        result = code_result(code, length)
+        return (-buckets[code], result.count(Knowledge.HIT), result.count(Knowledge.PARTIAL))
+    return code_result(min(buckets, key=rank), length)
+
+def do_adversarial_guessing(solutions_list:list[str], spelling_dictionary:list[str],
+        matrix:FeedbackMatrix=None, index:WordIndex=None, hard:bool=False,
+        verbosity:str='full'):
+    """One game with the human guessing against an adversary (Absurdle)."""
+    # There is no solution to start with.  Each guess gets whichever
+    # result keeps the most solutions possible, until just one is left
+    # and the human guesses it.
+    known = Knowledge(list(solutions_list))
+    if verbosity != 'none':
+        print( f"There are {len(known.wordlist)} possible words.")
+    result = ''
+    while result != Knowledge.HIT * known.length:
+        guess = ask_user_for_guess(spelling_dictionary, known if hard else None, index)
+        result = adversarial_result(guess, known.wordlist, matrix)
+        known.update(guess, result)
+        known.wordlist = prune_list(known.wordlist, known, matrix, index)
+        print_guess_result(guess, result, known, spelling_dictionary, verbosity)
+        PROFILER.end_turn(len(known.wordlist))
+    print(f"Solved in {len(known.history)} guesses.")
 
 
-def do_computer_guessing(spelling_dictionary:list[str], frequency_dictionary:list[str]):
+def do_computer_guessing(spelling_dictionary:list[str], frequency_dictionary:list[str],
+        matrix:FeedbackMatrix=None, strategy:str='letters', index:WordIndex=None,
+        tree:dict[str:str]=None, memo:GuessCache=None, hard:bool=False, verbosity:str='full'):
     """One game with the computer guessing."""
     solution = ask_user_for_solution(spelling_dictionary)
     # Make sure the solution is in the list of guessable words
     spelling_dictionary = merge_lists(spelling_dictionary, [solution])
-    known = Knowledge(spelling_dictionary)
+    known = Knowledge(possible_solutions(spelling_dictionary, matrix, solution))
 
-    print( f"There are {len(known.wordlist)} possible words.")
-    print( f"Most likely letters: {count_frequences(known.wordlist,'')}")
+    if verbosity != 'none':
+        print( f"There are {len(known.wordlist)} possible words.")
+        print( f"Most likely letters: {count_frequences(known.wordlist,'')}")
 
-    guess_history = []
     guess = ''
     while not is_solved(solution, guess):
-        guess = calculate_guess(spelling_dictionary, known )
-        result = test_guess(solution, guess)
+        guess = tree_guess(tree, known.history) if tree else None
+        if guess:
+            print( f"\n--------------------------\nI guess: {guess}\n")
+        else:
+            guess = calculate_guess(spelling_dictionary, known, matrix, strategy, memo=memo,
+                    hard=hard, index=index)
+        result = test_guess(solution, guess, matrix)
         known.update(guess, result)
-        known.wordlist = prune_list(known.wordlist, known)
+        known.wordlist = prune_list(known.wordlist, known, matrix, index)
         if solution not in known.wordlist:
             print( "Have a problem! solution no longer in the maybe_words!")
-        print_guess_result(solution, guess, result, known, guess_history, spelling_dictionary)
+        print_guess_result(guess, result, known, spelling_dictionary, verbosity)
+        PROFILER.end_turn(len(known.wordlist))
+    print(f"Solved in {len(known.history)} guesses.")
+
+# A decision tree maps the results seen so far, space separated, to
+# the next guess.  The root (no results yet) has key ''.
+
+def build_tree(spelling_dictionary:list[str], matrix:FeedbackMatrix, strategy:str='letters',
+        index:WordIndex=None, memo:GuessCache=None, hard:bool=False) -> dict[str:str]:
+    """Returns the decision tree of strategy over spelling_dictionary."""
+    # Each node carries the Knowledge the solver would have there, and the
+    # solutions that would actually lead there.  The two can differ, as
+    # Knowledge can be less strict than the feedback that led to it.
+    tree = {}
+    possible = possible_solutions(spelling_dictionary, matrix)
+    todo = [('', Knowledge(possible), possible)]
+    while todo:
+        key, known, possible = todo.pop()
+        guess = calculate_guess(spelling_dictionary, known, matrix, strategy,
+                verbose=False, memo=memo, hard=hard, index=index)
+        tree[key] = guess
+        if len(known.history) + 1 >= MAX_TURNS:
+            continue
+        branches = {}
+        for word, code in zip(possible, matrix.codes(guess, possible)):
+            if code != matrix.all_hits:
+                branches.setdefault(code, []).append(word)
+        for code, words in branches.items():
+            result = code_result(code, matrix.length)
+            child = known.branch()
+            child.update(guess, result)
+            child.wordlist = prune_list(child.wordlist, child, matrix, index)
+            todo.append(((key + ' ' + result).strip(), child, words))
+    return tree
+
+def tree_guess(tree:dict[str:str], history:list[tuple[str,str]]):
+    """Returns the tree's next guess after history, or None if off the tree."""
+    key = ''
+    for guess, result in history:
+        if tree.get(key) != guess:
+            return None
+        key = (key + ' ' + result).strip()
+    return tree.get(key)
+
+def save_tree(tree:dict[str:str], path:str, strategy:str, kind:str='decision tree',
+        notes:list[str]=()):
+    """Writes tree to path, one 'GUESS results...' line per node."""
+    # notes are extra comment lines for the heading.
+    with open(path, 'w') as f:
+        f.write(f"# wordle {kind}, strategy {strategy}, {len(tree)} nodes\n")
+        for note in notes:
+            f.write(f"# {note}\n")
+        for key in sorted(tree, key=lambda k: (k.count(' '), k)):
+            f.write(f"{tree[key]} {key}".rstrip() + '\n')
+
+def load_tree(path:str) -> dict[str:str]:
+    """Reads a decision tree written by save_tree."""
+    tree = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip() or line.startswith('#'):
+                continue
+            guess, _, key = line.rstrip('\n').partition(' ')
+            tree[key] = guess
+    return tree
+
+def tree_option() -> str:
+    """Returns the --tree file, or else the --book file, or None."""
+    # An opening book is just the first two levels of a tree.
+    return get_option('tree', get_option('book'))
+
+def do_build_tree(spelling_dictionary:list[str], matrix:FeedbackMatrix, strategy:str='letters',
+        index:WordIndex=None, memo:GuessCache=None, hard:bool=False):
+    """Builds the decision tree and writes it to --out."""
+    if matrix is None:
+        print( "The word lists are too big for a feedback matrix, so for a tree.")
+        return
+    path = get_option('out', f"wordle-tree-{strategy}.txt")
+    start = time.perf_counter()
+    tree = build_tree(spelling_dictionary, matrix, strategy, index, memo, hard)
+    save_tree(tree, path, strategy)
+    print( f"Wrote {len(tree)} nodes to {path} in {time.perf_counter() - start:.1f}s.")
+
+# An opening book holds the first guess, and the second guess for each
+# result the first can get against the solutions, saved as a tree.
+
+def book_guess(first:str, result:str, spelling_dictionary:list[str], matrix:FeedbackMatrix=None,
+        strategy:str='letters', index:WordIndex=None, memo:GuessCache=None,
+        hard:bool=False) -> str:
+    """Returns the second guess after first got result, or None if nothing fits."""
+    known = Knowledge(possible_solutions(spelling_dictionary, matrix))
+    known.update(first, result)
+    known.wordlist = prune_list(known.wordlist, known, matrix, index)
+    if not known.wordlist:
+        return None
+    return calculate_guess(spelling_dictionary, known, matrix, strategy, verbose=False,
+            memo=memo, hard=hard, index=index)
+
+def worker_book_guess(opening:tuple[str,str]) -> str:
+    """Returns book_guess for opening (first, result) in a worker process."""
+    # Workers are set up by init_bench_worker.
+    dictionary, known_words, matrix, strategy, index, tree, memo, hard = _bench_worker
+    return book_guess(*opening, dictionary, matrix, strategy, index, memo, hard)
+
+def build_book(spelling_dictionary:list[str], solutions_list:list[str],
+        matrix:FeedbackMatrix=None, strategy:str='letters', index:WordIndex=None,
+        memo:GuessCache=None, hard:bool=False, workers:int=1,
+        sources:tuple=()) -> tuple[dict[str:str], list[str]]:
+    """Returns the opening book, and the first guesses ranked best first."""
+    openings = rank_guesses(spelling_dictionary,
+            Knowledge(possible_solutions(spelling_dictionary, matrix)), matrix, strategy)
+    first = openings[0]
+    results = {test_guess(solution, first, matrix) for solution in solutions_list}
+    results = sorted(results - {Knowledge.HIT * len(first)})
+    pairs = [(first, result) for result in results]
+    if workers <= 1:
+        seconds = [book_guess(first, result, spelling_dictionary, matrix, strategy, index, memo,
+                hard) for result in results]
+    else:
+        chunksize = max(1, len(pairs) // (workers * 4))
+        memo_size = memo.maxsize if memo else 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_bench_worker,
+                initargs=(sources, strategy, None, memo_size, lookahead_settings(),
+                    hard)) as pool:
+            seconds = list(pool.map(worker_book_guess, pairs, chunksize=chunksize))
+    book = {'': first}
+    for result, second in zip(results, seconds):
+        if second:
+            book[result] = second
+    return book, openings
+
+def do_build_book(spelling_dictionary:list[str], solutions_list:list[str],
+        matrix:FeedbackMatrix=None, strategy:str='letters', index:WordIndex=None,
+        memo:GuessCache=None, sources:tuple=()):
+    """Builds the opening book and writes it to --out, for use with --book."""
+    path = get_option('out', f"wordle-book-{strategy}.txt")
+    workers = int(get_option('workers', str(os.cpu_count() or 1)))
+    hard = get_flag('hard')
+    start = time.perf_counter()
+    book, openings = build_book(spelling_dictionary, solutions_list, matrix, strategy, index,
+            memo, hard, workers, sources)
+    notes = [f"best openings: {' '.join(openings[:GuessCache.RANKING_KEPT])}"]
+    if hard:
+        notes.append("hard mode")
+    save_tree(book, path, strategy, 'opening book', notes)
+    print( f"Wrote {book['']} and {len(book) - 1} second guesses to {path} "
+            f"in {time.perf_counter() - start:.1f}s.")
+
+def play_quietly(solution:str, spelling_dictionary:list[str], matrix:FeedbackMatrix=None,
+        strategy:str='letters', index:WordIndex=None, tree:dict[str:str]=None,
+        memo:GuessCache=None, hard:bool=False) -> tuple[list[str], list[float]]:
+    """One game with the computer guessing and no output."""
+    # Returns the guesses made and the seconds each turn took.  While the
+    # game stays on the tree, pruning is put off, as only the fallback to
+    # calculate_guess needs the list of possibilities.
+    known = Knowledge(possible_solutions(spelling_dictionary, matrix, solution))
+    guess_history = []
+    turn_times = []
+    guess = ''
+    pruned = True
+    while not is_solved(solution, guess) and len(guess_history) < MAX_TURNS:
+        start = time.perf_counter()
+        guess = tree_guess(tree, known.history) if tree else None
+        if not guess:
+            if not pruned:
+                known.wordlist = prune_list(known.wordlist, known, matrix, index)
+            guess = calculate_guess(spelling_dictionary, known, matrix, strategy,
+                    verbose=False, memo=memo, hard=hard, index=index)
+        result = test_guess(solution, guess, matrix)
+        known.update(guess, result)
+        pruned = not tree
+        if pruned:
+            known.wordlist = prune_list(known.wordlist, known, matrix, index)
+        turn_times.append(time.perf_counter() - start)
+        guess_history.append(guess)
+        PROFILER.end_turn(len(known.wordlist))
+    return guess_history, turn_times
+
+# Multi-board games (Quordle, Octordle) play each guess on every board
+# not yet solved, each board with its own Knowledge.
+
+def multi_board_scores( matrix:FeedbackMatrix, guesses:list[str],
+        boards:list[list[str]] ) -> dict[str:float]:
+    """Returns dict of guess:possibilities expected to be left over all boards."""
+    # A board's expected possibilities left is sum(c * c) / n over the
+    # count c of each code, leaving out all hits as that solves it.
+    # Boards with the same possibilities are scored once and weighted.
+    # Every board's possibilities are gathered from a guess's row in one
+    # go and tagged by board with zip, so one Counter covers all boards.
+    groups = Counter(tuple(b) for b in boards if b)
+    words = []
+    tags = []
+    weight = {}
+    for tag, (wordlist, boards_like) in enumerate(groups.items()):
+        words += wordlist
+        tags += [tag] * len(wordlist)
+        weight[tag] = boards_like / len(wordlist)
+    gather = matrix.gatherer(words)
+    scores = {}
+    for guess in guesses:
+        row = matrix.row(guess)
+        if gather and row is not None:
+            codes = gather(row)
+        else:
+            codes = matrix.codes(guess, words)
+        counts = Counter(zip(tags, codes))
+        scores[guess] = sum(c * c * weight[tag] for (tag, code), c in counts.items()
+                if code != matrix.all_hits)
+    return scores
+
+def multi_board_guess(spelling_dictionary:list[str], knowns:list[Knowledge],
+        matrix:FeedbackMatrix=None, strategy:str='letters', memo:GuessCache=None) -> str:
+    """Returns the guess for the boards knowns, all of them unsolved."""
+    # A board down to one possibility is solved for free.  Otherwise the
+    # guess leaving fewest possibilities, preferring one that could solve
+    # a board.  Without a matrix, it's the strategy's guess for the board
+    # with fewest possibilities.  The memo keeps guesses for sets of
+    # boards, the same whatever order they're in.
+    smallest = min(knowns, key=lambda k: len(k.wordlist))
+    if len(smallest.wordlist) == 1:
+        return smallest.wordlist[0]
+    if not matrix:
+        return calculate_guess(spelling_dictionary, smallest, matrix, strategy,
+                verbose=False, memo=memo)
+    if memo:
+        key = ('boards', words_digest(spelling_dictionary),
+                ' '.join(sorted(k.fingerprint() for k in knowns)))
+        ranking = memo.get(key)
+        if ranking:
+            return ranking[0]
+    scores = multi_board_scores(matrix, spelling_dictionary, [k.wordlist for k in knowns])
+    possible = set(itertools.chain.from_iterable(k.wordlist for k in knowns))
+    guess = min(scores, key=lambda g: (scores[g], g not in possible))
+    if memo:
+        memo.put(key, [guess])
+    return guess
+
+def play_boards(solutions:list[str], spelling_dictionary:list[str], matrix:FeedbackMatrix=None,
+        strategy:str='letters', index:WordIndex=None, memo:GuessCache=None,
+        verbose:bool=False) -> tuple[list[str], list[float]]:
+    """One multi-board game with the computer guessing, one board per solution."""
+    # Returns the guesses made and the seconds each turn took.
+    knowns = [Knowledge(possible_solutions(merge_lists(list(spelling_dictionary), [s]), matrix, s))
+            for s in solutions]
+    solved = [False] * len(solutions)
+    guess_history = []
+    turn_times = []
+    while not all(solved) and len(guess_history) < MAX_TURNS + len(solutions):
+        start = time.perf_counter()
+        active = [i for i in range(0,len(solutions)) if not solved[i]]
+        guess = multi_board_guess(spelling_dictionary, [knowns[i] for i in active], matrix,
+                strategy, memo)
+        for i in active:
+            result = test_guess(solutions[i], guess, matrix)
+            knowns[i].update(guess, result)
+            knowns[i].wordlist = prune_list(knowns[i].wordlist, knowns[i], matrix, index)
+            solved[i] = is_solved(solutions[i], guess)
+        turn_times.append(time.perf_counter() - start)
         guess_history.append(guess)
-    print(f"Solved in {len(guess_history)} guesses.")
+        PROFILER.end_turn(sum(len(knowns[i].wordlist) for i in active))
+        if verbose:
+            print( f"\n--------------------------\nI guess: {guess}\n")
+            for i in active:
+                state = 'solved' if solved[i] else f"{len(knowns[i].wordlist)} possible"
+                print( f"Board {i+1}:  {space_str(knowns[i].history[-1][1])}    {state}")
+    return guess_history, turn_times
+
+def do_multi_board_guessing(solutions_list:list[str], spelling_dictionary:list[str],
+        boards:int, matrix:FeedbackMatrix=None, strategy:str='letters', index:WordIndex=None,
+        memo:GuessCache=None):
+    """One multi-board game with the computer guessing random solutions."""
+    solutions = random.sample(list(solutions_list), boards)
+    guesses, times = play_boards(solutions, spelling_dictionary, matrix, strategy, index, memo,
+            verbose=True)
+    print( f"\nSolutions: {' '.join(solutions)}")
+    print( f"Solved {boards} boards in {len(guesses)} guesses, "
+            f"{boards + BOARD_EXTRA_TURNS} allowed.")
+
+def multi_board_bench(solutions_list:list[str], spelling_dictionary:list[str], boards:int,
+        games:int, matrix:FeedbackMatrix=None, strategy:str='letters', index:WordIndex=None,
+        memo:GuessCache=None) -> dict:
+    """Returns statistics for games multi-board games of random solutions."""
+    allowed = boards + BOARD_EXTRA_TURNS
+    distribution = Counter()
+    turn_times = []
+    failures = 0
+    start = time.perf_counter()
+    for _ in range(0,games):
+        solutions = random.sample(list(solutions_list), boards)
+        guesses, times = play_boards(solutions, spelling_dictionary, matrix, strategy, index,
+                memo)
+        turn_times += times
+        distribution[len(guesses)] += 1
+        if len(guesses) > allowed or not set(solutions) <= set(guesses):
+            failures += 1
+    return {
+        'strategy': strategy,
+        'boards': boards,
+        'games': games,
+        'distribution': {str(n): distribution[n] for n in sorted(distribution)},
+        'mean_guesses': round(sum(n * c for n, c in distribution.items()) / games, 4)
+                if games else None,
+        'failures': failures,
+        'turn_ms': {
+            'mean': round(1000 * sum(turn_times) / len(turn_times), 3) if turn_times else 0.0,
+            'p95': round(1000 * percentile(turn_times, 95), 3),
+            'max': round(1000 * max(turn_times, default=0.0), 3),
+            },
+        'wall_seconds': round(time.perf_counter() - start, 3),
+        }
+
+def percentile( values:list[float], pct:float ) -> float:
+    """Returns the nearest-rank pct percentile of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -int(-pct * len(ordered) // 100))
+    return ordered[rank-1]
+
+def bench_report( strategy:str, solutions:list[str], games:list[tuple], wall:float ) -> dict:
+    """Returns benchmark statistics for games played against solutions."""
+    # games is one (guesses, turn_times) tuple per solution.
+    distribution = Counter()
+    failed = []
+    turn_times = []
+    unsolved = 0
+    for solution, (guesses, times) in zip(solutions, games):
+        turn_times += times
+        if not guesses or guesses[-1] != solution:
+            unsolved += 1
+            failed.append(solution)
+            continue
+        distribution[len(guesses)] += 1
+        if len(guesses) > WORDLE_TURNS:
+            failed.append(solution)
+    solved = sum(distribution.values())
+    return {
+        'strategy': strategy,
+        'games': len(solutions),
+        'distribution': {str(n): distribution[n] for n in sorted(distribution)},
+        'unsolved': unsolved,
+        'mean_guesses': round(sum(n * c for n, c in distribution.items()) / solved, 4)
+                if solved else None,
+        'failures': len(failed),
+        'failure_rate': round(len(failed) / len(solutions), 4) if solutions else 0.0,
+        'failed_words': failed,
+        'turn_ms': {
+            'mean': round(1000 * sum(turn_times) / len(turn_times), 3) if turn_times else 0.0,
+            'p95': round(1000 * percentile(turn_times, 95), 3),
+            'p99': round(1000 * percentile(turn_times, 99), 3),
+            'max': round(1000 * max(turn_times, default=0.0), 3),
+            },
+        'wall_seconds': round(wall, 3),
+        }
+
+class Profiler():
+    """Per-turn wall time of the solver's phases, when switched on."""
+    # enable() swaps each function in PHASES for a timed wrapper, so there
+    # is nothing in the way while it's off but end_turn() returning.
+    # Times are inclusive: print_guess_result's time includes the
+    # most_valued_words it calls.  Cache hits and misses are what the
+    # caches themselves counted in CACHE_STATS during the turn.  PHASES
+    # are all functions; classes are left alone.
+    PHASES = ('prune_list', 'calculate_guess', 'rank_guesses', 'letter_stats',
+            'valued_str', 'most_valued_words', 'flip_dictionary', 'print_guess_result')
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.seconds = Counter()
+        self.calls = Counter()
+        self.cache_seen = Counter()
+        self.turns = []
+
+    def enable(self):
+        """Starts timing the phases in this process."""
+        if self.enabled:
+            return
+        self.enabled = True
+        self.cache_seen = Counter(CACHE_STATS)
+        for name in Profiler.PHASES:
+            globals()[name] = self.timed(name, globals()[name])
+
+    def timed(self, name:str, func):
+        """Returns func, adding its time and calls to phase name."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.seconds[name] += time.perf_counter() - start
+                self.calls[name] += 1
+        return wrapper
+
+    def end_turn(self, candidates:int):
+        """Records the phases since the last turn, and candidates left."""
+        if not self.enabled:
+            return
+        self.turns.append({'seconds': dict(self.seconds), 'calls': dict(self.calls),
+                'cache': dict(CACHE_STATS - self.cache_seen), 'candidates': candidates})
+        self.seconds = Counter()
+        self.calls = Counter()
+        self.cache_seen = Counter(CACHE_STATS)
+
+    def take(self) -> list[dict]:
+        """Returns the turns recorded so far, and forgets them."""
+        turns, self.turns = self.turns, []
+        return turns
+
+    def summary(self) -> dict:
+        """Returns the phase timings, sizes and cache hits over all turns."""
+        seconds = Counter()
+        calls = Counter()
+        cache = Counter()
+        for turn in self.turns:
+            seconds.update(turn['seconds'])
+            calls.update(turn['calls'])
+            cache.update(turn['cache'])
+        candidates = [turn['candidates'] for turn in self.turns]
+        phases = {}
+        for name in Profiler.PHASES:
+            if not calls[name]:
+                continue
+            times = [turn['seconds'].get(name, 0.0) for turn in self.turns]
+            phases[name] = {
+                'calls': calls[name],
+                'total_s': round(seconds[name], 3),
+                'turn_ms': round(1000 * seconds[name] / len(self.turns), 3),
+                'p95_turn_ms': round(1000 * percentile(times, 95), 3),
+                }
+        return {
+            'turns': len(self.turns),
+            'candidates': {
+                'mean': round(sum(candidates) / len(candidates), 1) if candidates else 0.0,
+                'max': max(candidates, default=0),
+                },
+            'phases': phases,
+            'cache': {name: cache[name] for name in sorted(cache)},
+            }
+
+# --profile, or WORDLE_PROFILE=1 in the environment, switches this on.
+PROFILER = Profiler()
+
+def profile_option() -> str:
+    """Returns '1' to time phases, a file name to also dump cProfile stats, or None."""
+    # The environment carries the setting to worker processes.
+    value = get_option('profile', os.environ.get('WORDLE_PROFILE'))
+    if value in (None, '', '0'):
+        value = '1' if get_flag('profile') else None
+    return value
+
+def bench_game(solution:str, spelling_dictionary:list[str], known_words:set[str],
+        matrix:FeedbackMatrix=None, strategy:str='letters', index:WordIndex=None,
+        tree:dict[str:str]=None, memo:GuessCache=None, hard:bool=False) -> tuple:
+    """Plays one benchmark game, returning its guesses and turn times."""
+    # Also returns the memo hits and misses during the game, and any
+    # profiled turns, so they can be added up across worker processes.
+    # Make sure the solution is in the list of guessable words
+    if solution not in known_words:
+        spelling_dictionary = spelling_dictionary + [solution]
+    hits, misses = (memo.hits, memo.misses) if memo else (0, 0)
+    guesses, times = play_quietly(solution, spelling_dictionary, matrix, strategy, index, tree,
+            memo, hard)
+    if memo:
+        hits, misses = memo.hits - hits, memo.misses - misses
+    return guesses, times, hits, misses, PROFILER.take()
+
+# Set in each worker process by init_bench_worker.
+_bench_worker = None
+
+def init_bench_worker(sources:tuple, strategy:str, tree_file:str=None, memo_size:int=0,
+        lookahead:tuple=(), hard:bool=False):
+    """Loads what one worker process needs to play benchmark games."""
+    # The word lists and matrix come from the mmap'd cache, so workers
+    # share its pages instead of each parsing the dictionaries again.
+    # sources are the arguments to load_cache, lookahead to set_lookahead.
+    global _bench_worker
+    set_lookahead(*lookahead)
+    if profile_option():
+        PROFILER.enable()
+    cache = load_cache(*sources)
+    dictionary = list(cache.guesses)
+    tree = load_tree(tree_file) if tree_file else None
+    memo = GuessCache(memo_size) if memo_size > 0 else None
+    _bench_worker = (dictionary, set(dictionary), cache.matrix, strategy, WordIndex(dictionary),
+            tree, memo, hard)
+
+def worker_bench_game(solution:str) -> tuple:
+    """Plays one benchmark game in a worker process."""
+    return bench_game(solution, *_bench_worker)
+
+def bench_games(solutions:list[str], spelling_dictionary:list[str], matrix:FeedbackMatrix=None,
+        strategy:str='letters', index:WordIndex=None, workers:int=1,
+        tree_file:str=None, memo:GuessCache=None, sources:tuple=(),
+        hard:bool=False) -> tuple[list[tuple], dict]:
+    """Plays a game for each solution, returning results in the same order."""
+    # Also returns the memo hits and misses over all the games.
+    if workers <= 1:
+        known_words = set(spelling_dictionary)
+        tree = load_tree(tree_file) if tree_file else None
+        played = [bench_game(solution, spelling_dictionary, known_words, matrix, strategy, index,
+                tree, memo, hard) for solution in solutions]
+    else:
+        # map() hands back results in order of solutions, however the
+        # workers happen to be scheduled.
+        chunksize = max(1, len(solutions) // (workers * 8))
+        memo_size = memo.maxsize if memo else 0
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_bench_worker,
+                initargs=(sources, strategy, tree_file, memo_size, lookahead_settings(),
+                    hard)) as pool:
+            played = list(pool.map(worker_bench_game, solutions, chunksize=chunksize))
+    games = [(p[0], p[1]) for p in played]
+    for p in played:
+        PROFILER.turns += p[4]
+    memo_stats = {'hits': sum(p[2] for p in played), 'misses': sum(p[3] for p in played)}
+    return games, memo_stats
+
+def do_bench(solutions_list:list[str], spelling_dictionary:list[str], matrix:FeedbackMatrix=None,
+        strategy:str='letters', index:WordIndex=None, memo:GuessCache=None, sources:tuple=()):
+    """Computer solves every solution (or a sample), reporting statistics."""
+    # With --boards=N, plays --sample games (default 100) of N random
+    # solutions at once instead.
+    solutions = list(solutions_list)
+    sample = get_option('sample')
+    boards = int(get_option('boards', '1'))
+    if boards > 1:
+        random.seed(get_option('seed', '0'))
+        report = multi_board_bench(solutions, spelling_dictionary, boards, int(sample or 100),
+                matrix, strategy, index, memo)
+        allowed = boards + BOARD_EXTRA_TURNS
+    else:
+        if sample:
+            random.seed(get_option('seed', '0'))
+            solutions = random.sample(solutions, min(int(sample), len(solutions)))
+        workers = int(get_option('workers', '1'))
+        hard = get_flag('hard')
+        start = time.perf_counter()
+        games, memo_stats = bench_games(solutions, spelling_dictionary, matrix, strategy, index,
+                workers, tree_option(), memo, sources, hard)
+        report = bench_report(strategy, solutions, games, time.perf_counter() - start)
+        report['hard'] = hard
+        report['workers'] = workers
+        report['memo'] = memo_stats
+        allowed = WORDLE_TURNS
+    if PROFILER.enabled:
+        report['profile'] = PROFILER.summary()
+
+    output = get_option('json')
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print( f"Solved {report['games'] - report['failures']} of {report['games']} "
+                f"within {allowed} guesses, mean {report['mean_guesses']} guesses, "
+                f"in {report['wall_seconds']}s.  Report in {output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+class Solver():
+    """Suggests guesses for games, without any console input or output."""
+
+    def __init__(self, spelling_dictionary:list[str], matrix:FeedbackMatrix=None,
+            index:WordIndex=None, strategy:str='letters', tree:dict[str:str]=None,
+            memo:GuessCache=None) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'")
+        self.spelling_dictionary = spelling_dictionary
+        self.matrix = matrix
+        self.index = index
+        self.strategy = strategy
+        self.tree = tree
+        self.memo = memo
+
+    @classmethod
+    def from_cache(cls, sources:tuple=(), strategy:str='letters',
+            tree:dict[str:str]=None, memo:GuessCache=None) -> 'Solver':
+        """Returns a Solver using the word lists and matrix in the cache."""
+        # sources are the arguments to load_cache.
+        cache = load_cache(*sources)
+        dictionary = list(cache.guesses)
+        return cls(dictionary, cache.matrix, WordIndex(dictionary), strategy, tree, memo)
+
+    def start(self) -> Knowledge:
+        """Returns what's known before the first guess."""
+        return Knowledge(possible_solutions(self.spelling_dictionary, self.matrix))
+
+    def update(self, known:Knowledge, guess:str, result:str):
+        """Adds guess and its result to known, pruning its possibilities."""
+        if not isinstance(guess, str) or not isinstance(result, str):
+            raise ValueError(f"Guess and result must be strings, not {guess!r} and {result!r}")
+        guess = guess.upper().strip()
+        if len(guess) != known.length or any(c not in ALPHABET for c in guess):
+            raise ValueError(f"Bad guess '{guess}'")
+        if len(result) != known.length or any(r not in CODE_DIGITS for r in result):
+            raise ValueError(f"Bad result '{result}', use {known.length} of "
+                    f"'{Knowledge.HIT}{Knowledge.PARTIAL}{Knowledge.MISS}'")
+        known.update(guess, result)
+        known.wordlist = prune_list(known.wordlist, known, self.matrix, self.index)
+
+    def guess(self, known:Knowledge):
+        """Returns the next guess, or None if solved or nothing fits."""
+        if known.history and known.history[-1][1] == Knowledge.HIT * known.length:
+            return None
+        if not known.wordlist:
+            return None
+        guess = tree_guess(self.tree, known.history) if self.tree else None
+        if not guess:
+            guess = calculate_guess(self.spelling_dictionary, known, self.matrix, self.strategy,
+                    verbose=False, memo=self.memo)
+        return guess
+
+    def solve(self, history:list[tuple[str,str]]) -> tuple[str, list[str]]:
+        """Returns next guess and remaining possibilities after history."""
+        known = self.start()
+        for guess, result in history:
+            self.update(known, guess, result)
+        return self.guess(known), known.wordlist
+
+def solver_reply(solver:Solver, known:Knowledge) -> dict:
+    """Returns the reply describing the next guess for known."""
+    reply = {
+        'guess': solver.guess(known),
+        'remaining': len(known.wordlist),
+        'solved': bool(known.history) and known.history[-1][1] == Knowledge.HIT * known.length,
+        }
+    if len(known.wordlist) <= CANDIDATES_SHOWN:
+        reply['candidates'] = known.wordlist
+    return reply
+
+def history_turns(history) -> list[tuple]:
+    """Returns history as a list of (guess, result), or raises ValueError."""
+    # Just the shape is checked here; Solver.update checks the contents.
+    if not isinstance(history, list):
+        raise ValueError("History must be a list of [guess, result] pairs")
+    turns = []
+    for turn in history:
+        if not isinstance(turn, (list, tuple)) or len(turn) != 2:
+            raise ValueError(f"Bad history entry {turn!r}, use [guess, result]")
+        turns.append(tuple(turn))
+    return turns
+
+def handle_request(solver:Solver, sessions:dict, request:dict) -> dict:
+    """Returns the reply to one JSON-lines request."""
+    # Requests are one of:
+    #   {"history": [[guess, result], ...]}       no session kept
+    #   {"session": id}                            start (or restart) a game
+    #   {"session": id, "guess": g, "result": r}   a turn of that game
+    #   {"session": id, "end": true}               forget the game
+    # Any "id" in the request is copied to the reply.
+    reply = {}
+    if 'id' in request:
+        reply['id'] = request['id']
+    if 'history' in request:
+        known = solver.start()
+        for guess, result in history_turns(request['history']):
+            solver.update(known, guess, result)
+        reply.update(solver_reply(solver, known))
+        return reply
+    if 'session' not in request:
+        raise ValueError("Request needs 'history' or 'session'")
+    session = request['session']
+    reply['session'] = session
+    if request.get('end'):
+        reply['ended'] = sessions.pop(session, None) is not None
+        return reply
+    if 'guess' in request:
+        if session not in sessions:
+            raise ValueError(f"No session '{session}'")
+        solver.update(sessions[session], request['guess'], request.get('result', ''))
+    else:
+        sessions[session] = solver.start()
+    reply.update(solver_reply(solver, sessions[session]))
+    return reply
+
+def do_jsonl(solver:Solver, infile=sys.stdin, outfile=sys.stdout):
+    """Answers JSON-lines requests from infile until it closes."""
+    sessions = {}
+    for line in infile:
+        if not line.strip():
+            continue
+        request = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            reply = handle_request(solver, sessions, request)
+        except (ValueError, TypeError, KeyError) as e:
+            reply = {'error': str(e)}
+            if isinstance(request, dict) and 'id' in request:
+                reply['id'] = request['id']
+        outfile.write(json.dumps(reply) + '\n')
+        outfile.flush()
+
+# Set in each worker process by init_solver_worker.
+_solver_worker = None
+
+def init_solver_worker(sources:tuple, strategy:str, tree_file:str=None, memo_size:int=0,
+        lookahead:tuple=()):
+    """Loads the Solver one service worker process uses."""
+    global _solver_worker
+    set_lookahead(*lookahead)
+    tree = load_tree(tree_file) if tree_file else None
+    memo = GuessCache(memo_size) if memo_size > 0 else None
+    _solver_worker = Solver.from_cache(sources, strategy, tree, memo)
+
+def worker_solve(history:list[tuple[str,str]]) -> dict:
+    """Returns the reply for a game's history, in a worker process."""
+    known = _solver_worker.start()
+    for guess, result in history:
+        _solver_worker.update(known, guess, result)
+    return solver_reply(_solver_worker, known)
+
+class SolverService():
+    """HTTP service for many games at once, on asyncio."""
+    # A session is just its guess history; workers rebuild the Knowledge
+    # from it, which is cheap beside choosing the guess and keeps what
+    # crosses between processes small.  Each session has a lock, so its
+    # turns are played one after another.  Routes (JSON in and out):
+    #   POST   /sessions          start a game
+    #   GET    /sessions/<id>     the game's current suggestion
+    #   POST   /sessions/<id>     {"guess": g, "result": r}
+    #   DELETE /sessions/<id>     end the game
+    #   POST   /solve             {"history": [[guess, result], ...]}
+    #   GET    /health            counters
+
+    def __init__(self, pool, session_ttl:float=600, max_sessions:int=10000) -> None:
+        self.pool = pool
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()   # id -> [history, reply, last used, lock]
+        self.ids = itertools.count(1)
+        self.requests = 0
+        self.evicted = 0
+
+    async def solve(self, history:list) -> dict:
+        """Returns the reply for history, worked out in the pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, worker_solve, history)
+
+    def touch(self, session:str) -> list:
+        """Returns the session, marking it as just used."""
+        if session not in self.sessions:
+            raise KeyError(session)
+        self.sessions.move_to_end(session)
+        entry = self.sessions[session]
+        entry[2] = time.monotonic()
+        return entry
+
+    def evict_idle(self):
+        """Drops sessions idle longer than session_ttl."""
+        # Sessions are kept in order of last use, oldest first.
+        oldest = time.monotonic() - self.session_ttl
+        while self.sessions:
+            session, entry = next(iter(self.sessions.items()))
+            if entry[2] > oldest:
+                break
+            del self.sessions[session]
+            self.evicted += 1
+
+    async def sweep(self):
+        """Evicts idle sessions every so often, forever."""
+        while True:
+            await asyncio.sleep(max(1.0, self.session_ttl / 4))
+            self.evict_idle()
+
+    async def dispatch(self, method:str, path:str, body:dict) -> tuple[int, dict]:
+        """Returns (HTTP status, reply) for one request."""
+        parts = [p for p in path.split('?')[0].split('/') if p]
+        if parts == ['health'] and method == 'GET':
+            return 200, {'sessions': len(self.sessions), 'requests': self.requests,
+                    'evicted': self.evicted}
+        if parts == ['solve'] and method == 'POST':
+            return 200, await self.solve(history_turns(body.get('history', [])))
+        if parts == ['sessions'] and method == 'POST':
+            self.evict_idle()
+            while len(self.sessions) >= self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted += 1
+            session = str(next(self.ids))
+            reply = await self.solve([])
+            self.sessions[session] = [[], reply, time.monotonic(), asyncio.Lock()]
+            return 201, dict(session=session, **reply)
+        if len(parts) == 2 and parts[0] == 'sessions':
+            session = parts[1]
+            if session not in self.sessions:
+                return 404, {'error': f"No session '{session}'"}
+            if method == 'DELETE':
+                del self.sessions[session]
+                return 200, {'session': session, 'ended': True}
+            entry = self.touch(session)
+            if method == 'POST':
+                async with entry[3]:
+                    history = entry[0] + [(body.get('guess', ''), body.get('result', ''))]
+                    reply = await self.solve(history)
+                    # The session may have been evicted or ended meanwhile.
+                    if session in self.sessions:
+                        entry[0], entry[1] = history, reply
+            return 200, dict(session=session, **entry[1])
+        return 404, {'error': f"No route {method} {path}"}
+
+    async def handle_client(self, reader, writer):
+        """Serves HTTP/1.1 requests on one connection until it closes."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, *_ = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', '0'))
+                raw = await reader.readexactly(length) if length else b''
+                self.requests += 1
+                try:
+                    body = json.loads(raw) if raw else {}
+                    if not isinstance(body, dict):
+                        raise ValueError("Body must be a JSON object")
+                    status, reply = await self.dispatch(method.upper(), path, body)
+                except (ValueError, TypeError) as e:
+                    status, reply = 400, {'error': str(e)}
+                except Exception as e:
+                    # Whatever else went wrong, likely in a worker, the
+                    # client still gets a reply.
+                    status, reply = 500, {'error': f"{type(e).__name__}: {e}"}
+                payload = json.dumps(reply).encode()
+                closing = headers.get('connection', '').lower() == 'close'
+                writer.write(f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                        f"Content-Type: application/json\r\n"
+                        f"Content-Length: {len(payload)}\r\n"
+                        f"Connection: {'close' if closing else 'keep-alive'}\r\n\r\n".encode()
+                        + payload)
+                await writer.drain()
+                if closing:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+HTTP_REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+        500: 'Internal Server Error'}
+
+async def serve(host:str, port:int, service:SolverService):
+    """Runs service on host:port until cancelled."""
+    server = await asyncio.start_server(service.handle_client, host, port)
+    sweeper = asyncio.create_task(service.sweep())
+    print( f"Serving on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sweeper.cancel()
+
+def do_serve(strategy:str='letters', memo_size:int=0, sources:tuple=()):
+    """Runs the solver as an HTTP service."""
+    workers = int(get_option('workers', str(os.cpu_count() or 1)))
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=init_solver_worker,
+            initargs=(sources, strategy, tree_option(), memo_size,
+                lookahead_settings())) as pool:
+        service = SolverService(pool, float(get_option('session-ttl', '600')),
+                int(get_option('max-sessions', '10000')))
+        try:
+            asyncio.run(serve(get_option('host', '127.0.0.1'), int(get_option('port', '8080')),
+                    service))
+        except KeyboardInterrupt:
+            pass
 
 def main():
     """Main."""
-    solutions_list = load_wordlist(SOLUTIONS_FILE)
-    spelling_dictionary = load_wordlist(GUESSES_FILE)
-    frequency_dictionary = load_wordlist(FREQUENCY_FILE)
+    # Other word lists, of other lengths, can be given on the command line.
+    sources = (get_option('cache', CACHE_FILE),
+            (get_option('solutions', SOLUTIONS_FILE), get_option('guesses', GUESSES_FILE),
+                get_option('frequency', FREQUENCY_FILE)),
+            int(get_option('length', str(WORD_LENGTH))))
+    cache = load_cache(*sources)
+    solutions_list = cache.solutions
+    spelling_dictionary = list(cache.guesses)
+    frequency_dictionary = cache.frequency
+    matrix = cache.matrix
+    index = WordIndex(spelling_dictionary)
+    strategy = get_option('strategy', 'letters')
+    if strategy not in STRATEGIES:
+        print( f"Unknown strategy '{strategy}', choose from {', '.join(STRATEGIES)}.")
+        return
+    if matrix is None and strategy in MATRIX_STRATEGIES:
+        print( f"The word lists are too big, or the words too long, for a feedback matrix, "
+                f"so for the {strategy} strategy.  Using letters instead.")
+        strategy = 'letters'
+    if get_option('verbosity', 'full') not in VERBOSITY:
+        print( f"Unknown verbosity '{get_option('verbosity')}', choose from {', '.join(VERBOSITY)}.")
+        return
+    # Look-ahead settings, --budget in milliseconds per turn.
+    set_lookahead(int(get_option('depth', str(LOOKAHEAD_DEPTH))),
+            int(get_option('top-k', str(LOOKAHEAD_TOP_K))),
+            float(get_option('budget', str(LOOKAHEAD_BUDGET * 1000))) / 1000)
     ##analyze_list( spelling_dictionary)
 
+    # Rankings already worked out are kept across games, and across
+    # sessions if there's a --memo file.  --memo-size=0 turns this off.
+    memo = None
+    memo_size = int(get_option('memo-size', '4096'))
+    memo_file = get_option('memo')
+    if memo_size > 0:
+        memo = GuessCache(memo_size)
+        if memo_file:
+            memo.load(memo_file)
+
+    # With profiling on, the phase timings go to stderr at the end (bench
+    # puts them in its report), and --profile=FILE also writes cProfile
+    # stats for this process, for python -m pstats FILE.
+    profile = profile_option()
+    profiler = None
+    if profile:
+        PROFILER.enable()
+        if profile != '1':
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+    args = get_args()
+    try:
+        if args and args[0] == 'bench':
+            do_bench(solutions_list, spelling_dictionary, matrix, strategy, index, memo, sources)
+        elif args and args[0] == 'tree':
+            do_build_tree(spelling_dictionary, matrix, strategy, index, memo, get_flag('hard'))
+        elif args and args[0] == 'book':
+            do_build_book(spelling_dictionary, solutions_list, matrix, strategy, index, memo,
+                    sources)
+        elif args and args[0] == 'jsonl':
+            tree = load_tree(tree_option()) if tree_option() else None
+            do_jsonl(Solver(spelling_dictionary, matrix, index, strategy, tree, memo))
+        elif args and args[0] == 'serve':
+            do_serve(strategy, memo_size, sources)
+        else:
+            play_games(solutions_list, spelling_dictionary, frequency_dictionary, matrix,
+                    strategy, index, memo, memo_file)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            print( f"Wrote cProfile stats to {profile}", file=sys.stderr)
+        if PROFILER.turns and args[:1] != ['bench']:
+            print(json.dumps(PROFILER.summary(), indent=2), file=sys.stderr)
+    if memo and memo_file:
+        memo.save(memo_file)
+
+def play_games(solutions_list:list[str], spelling_dictionary:list[str],
+        frequency_dictionary:list[str], matrix:FeedbackMatrix=None, strategy:str='letters',
+        index:WordIndex=None, memo:GuessCache=None, memo_file:str=None):
+    """Interactive games, one after another."""
+    # --hard holds guesses to the hints so far, and --absurd has the
+    # human play against an adversary instead of a random solution.
+    # --boards=N has the computer play N boards at once.
+    tree = load_tree(tree_option()) if tree_option() else None
+    hard = get_flag('hard')
+    verbosity = get_option('verbosity', 'full')
+
     human_is_the_guesser = does_the_human_guess()
     finished = False
+    boards = int(get_option('boards', '1'))
     while not finished:
-        if human_is_the_guesser:
+        if not human_is_the_guesser and boards > 1:
+            do_multi_board_guessing(solutions_list, spelling_dictionary, boards, matrix,
+                    strategy, index, memo)
+            input( "\nPress Enter for another game: ")
+        elif human_is_the_guesser and get_flag('absurd'):
+            do_adversarial_guessing(solutions_list, spelling_dictionary, matrix, index, hard,
+                    verbosity)
+        elif human_is_the_guesser:
             do_human_guessing(
                     fetch_random_solution(solutions_list),
-                    spelling_dictionary)
+                    spelling_dictionary, matrix, index, hard, verbosity)
         else:
-            do_computer_guessing(spelling_dictionary, frequency_dictionary)
+            do_computer_guessing(spelling_dictionary, frequency_dictionary,
+                    matrix, strategy, index, tree, memo, hard, verbosity)
+            if memo and memo_file:
+                memo.save(memo_file)
 
 if __name__ == '__main__':
     main()